@@ -0,0 +1,78 @@
+import os
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+GROUPINGS_FILE = "input/grupperinger.csv"
+# samtidighetsfaktor per gruppering, brukes for dimensjonerende effekt (faktor x sum av byggenes topper)
+SIMULTANEITY_FACTORS = {
+    "energiomraadeid" : 0.8,
+    "bygningsomraadeid" : 0.8,
+}
+DEFAULT_SIMULTANEITY_FACTOR = 1.0
+
+def membership_matrix(labels):
+    # (grupper x bygg) med 1 der bygget er med i gruppen
+    groups, inverse = np.unique(np.asarray(labels), return_inverse = True)
+    n = len(inverse)
+    membership = sparse.csr_matrix((np.ones(n), (inverse, np.arange(n))), shape = (len(groups), n))
+    return groups, inverse, membership
+
+def selection_membership(groups, column_index):
+    # groups: liste med objectid-lister (f.eks. ett polygon hver) -> (grupper x kolonner) i timedataens rekkefølge
+    rows, columns = [], []
+    for row, object_ids in enumerate(groups):
+        group_columns = [column_index[object_id] for object_id in object_ids if object_id in column_index]
+        rows.extend([row] * len(group_columns))
+        columns.extend(group_columns)
+    return sparse.csr_matrix((np.ones(len(columns)), (rows, columns)), shape = (len(groups), len(column_index)))
+
+def user_groupings(object_ids, filename = GROUPINGS_FILE):
+    # valgfri fil med kolonnene objectid;gruppering;gruppe (et bygg kan være med i flere grupper)
+    if not os.path.exists(filename):
+        return {}
+    df = pd.read_csv(filename, sep = None, engine = "python")
+    position = {object_id : index for index, object_id in enumerate(object_ids)}
+    groupings = {}
+    for grouping, df_grouping in df.groupby("gruppering"):
+        df_grouping = df_grouping.loc[df_grouping["objectid"].isin(position)]
+        groups, rows = np.unique(df_grouping["gruppe"].to_numpy(), return_inverse = True)
+        columns = df_grouping["objectid"].map(position).to_numpy()
+        membership = sparse.csr_matrix((np.ones(len(columns)), (rows, columns)), shape = (len(groups), len(object_ids)))
+        groupings[grouping] = (groups, membership)
+    return groupings
+
+def aggregate(membership, matrices):
+    # alle serier i ett sparse matriseprodukt: (grupper x bygg) @ (bygg x serier*8760)
+    series_names = list(matrices.keys())
+    stacked = np.hstack([np.nan_to_num(matrices[series_name]) for series_name in series_names])
+    aggregated = np.asarray(membership @ stacked).reshape(membership.shape[0], len(series_names), -1)
+    return {series_name : aggregated[:, i, :] for i, series_name in enumerate(series_names)}
+
+def group_summary(grouping, groups, membership, matrices):
+    aggregated = aggregate(membership, matrices)
+    factor = SIMULTANEITY_FACTORS.get(grouping, DEFAULT_SIMULTANEITY_FACTOR)
+    frames = []
+    for series_name, matrix in matrices.items():
+        building_peaks = np.max(np.abs(np.nan_to_num(matrix)), axis = 1)
+        non_coincident = membership @ building_peaks
+        frames.append(pd.DataFrame({
+            "gruppering" : grouping,
+            "gruppe" : groups,
+            "serie" : series_name,
+            "energi" : np.sum(aggregated[series_name], axis = 1),
+            "effekt_samtidig" : np.max(np.abs(aggregated[series_name]), axis = 1),
+            "effekt_ikke_samtidig" : non_coincident,
+            "samtidighetsfaktor" : factor,
+            "dimensjonerende_effekt" : factor * non_coincident,
+        }))
+    return aggregated, pd.concat(frames, ignore_index = True)
+
+def to_timedata(groups, aggregated):
+    # samme lange format som <scenario>_timedata.csv: 8760 rader per serie, én kolonne per gruppe
+    frames = []
+    for series_name, matrix in aggregated.items():
+        df = pd.DataFrame(matrix.T, columns = [str(group) for group in groups])
+        df["ID"] = series_name
+        frames.append(df)
+    return pd.concat(frames, ignore_index = True)
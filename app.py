@@ -1,59 +1,42 @@
 import streamlit as st
 import pandas as pd
-import folium
-from folium.plugins import MarkerCluster, Draw
-from streamlit_folium import st_folium
-import geopandas as gpd
-from shapely.geometry import Point, Polygon
-import pyproj
 import numpy as np
-import os
-from functools import reduce
 import plotly.express as px
 import plotly.graph_objects as go
-import plotly.figure_factory as ff
-from plotly.subplots import make_subplots
-import statsmodels.api as sm
-from folium.plugins import Fullscreen, minimap
-from energyanalysis import EnergyAnalysis
-from streamlit_extras.switch_page_button import switch_page
-import time
-from streamlit_extras.no_default_selectbox import selectbox
+# kart- og geometripakkene og energianalysen importeres først der de brukes, se src/scripts/startup_benchmark.py
+from selectioncache import SelectionCache
+from scenariocatalog import ScenarioCatalog
+from downsampling import downsample, chart_width
+from composer import REDUCTION_MEASURES
+from pricing import HourlyFactor, hourly_series, HOURLY_PRICE_FILE, HOURLY_EMISSION_FILE
+from tariffs import read_tariffs, capacity_cost
+from projects import read_projects, available_projects
+from warmup import start_warmup, temperature_array, building_gdf
+from peakanalysis import SEASON_MASKS, BUILDING
+from etcurve import temperature_statistics, load_statistics, column_names, fit
 
-def run_energyanalysis():
+def run_energyanalysis(project):
+    from energyanalysis import EnergyAnalysis
     energy_analysis = EnergyAnalysis(
-        building_table = "building_table_østmarka.xlsx",
+        building_table = project["bygningstabell"],
         energy_area_id = "energiomraadeid",
         building_area_id = "bygningsomraadeid",
-        scenario_file_name = "input/scenarier.xlsx",
-        temperature_array_file_path = "input/utetemperatur.xlsx")
+        scenario_file_name = project["scenariofil"],
+        temperature_array_file_path = project["utetemperatur"],
+        output_folder = project["output"])
     energy_analysis.main()
 
-@st.cache_resource(show_spinner=False)
-def import_df(filename):
-    df = pd.read_csv(filename, low_memory=False)
-    return df
-
-@st.cache_resource(show_spinner=False)
-def import_temperature_array(filename):
-    df = pd.read_excel(filename).to_numpy().ravel()
-    return df
-
-@st.cache_resource(show_spinner=False)
-def read_csv(folder_path):
-    csv_file_list, scenario_name_list = [], []
-    for filename in os.listdir(folder_path):
-        if filename.endswith("unfiltered.csv"):
-            scenario_name_list.append(filename.split(sep = "_")[0])
-            csv_file_list.append(filename)
-    return csv_file_list, scenario_name_list
-
-@st.cache_resource(show_spinner=False)
-def convert_df_to_gdf(df, selected_buildings_option):
-    geometry = [Point(lon, lat) for lon, lat in zip(df['x'], df['y'])]
-    gdf = gpd.GeoDataFrame(df, geometry=geometry, crs = "25832")
-    gdf = gdf.loc[gdf['bygningsomraadeid'] == selected_buildings_option]
-    return gdf
+def compare_polygons(catalog, scenario_name, groups):
+    # alle tegnede områder for ett scenario i én omgang, se HourlyData.aggregate_groups
+    results = catalog.hourly(scenario_name).aggregate_groups([list(group) for group in groups])
+    reference = results[SelectionCache.THERMAL_DEMAND_FOR_CALCULATION] + results[SelectionCache.ELECTRIC_DEMAND_FOR_CALCULATION]
+    grid = results[SelectionCache.GRID]
+    return {
+        "referanse_energi" : np.sum(reference, axis = 1),
+        "energi" : np.sum(grid, axis = 1),
+        "vintertopp" : np.max(grid[:, SEASON_MASKS["vinter"]], axis = 1),
+        "sommertopp" : np.max(grid[:, SEASON_MASKS["sommer"]], axis = 1),
+    }
 
 class Dashboard:
     def __init__(self):
@@ -71,6 +54,7 @@ class Dashboard:
             "#767171", #referansesituasjon
             "#ffc358", #solceller
         ]
+        self.chart_width_px = chart_width(columns = 2) # grafene ligger i to like kolonner, se downsampling.chart_width
         self.set_streamlit_settings()
 
     def __hour_to_month(self, hourly_array):
@@ -109,55 +93,90 @@ class Dashboard:
         
     def adjust_input_parameters_middle(self):
         with st.sidebar:
+            # prosjekter uten navngitte bygningsmasser viser bygningsområdene slik de står i sammendraget
+            selected_buildings_option_map = self.project.get("bygningsmasser") or {str(area) : area for area in self.catalog.building_areas()}
             selected_buildings_option = st.selectbox(
                 "Velg bygningsmasse", 
-                options = [
-                    "Eksisterende bygningsmasse", 
-                    "Planforslag (inkl. dagens bygg som skal bevares)", 
-                    "Planforslag (ekskl. helsebygg)", 
-                    "Planforslag og områdene rundt Østmarka"
-                    ]
+                options = list(selected_buildings_option_map.keys())
                     )
-            selected_buildings_option_map = {
-                "Eksisterende bygningsmasse" : "E",
-                "Planforslag (inkl. dagens bygg som skal bevares)" : "P1",
-                "Planforslag (ekskl. helsebygg)" : "P2",
-                "Planforslag og områdene rundt Østmarka" : "P3"
-            }
             self.selected_buildings_option = selected_buildings_option_map[selected_buildings_option]
             self.map_scenario_name = self.scenario_picker(
                 key = "kartvisning", 
                 default_label = "Velg scenario"
                 )
-            self.elprice = st.number_input("Velg strømpris (kr/kWh)", min_value = 0.8, step = 0.2, value = 1.0, max_value = 10.0)
-            self.co2_kWh = st.number_input("Velg utslippsfaktor", min_value = 1, step = 5, value = 17, max_value = 200) / 1000000
+            self.elprice = self.__hourly_factor_picker(
+                label = "Strømpris",
+                filename = HOURLY_PRICE_FILE,
+                number_input = lambda: st.number_input("Velg strømpris (kr/kWh)", min_value = 0.8, step = 0.2, value = 1.0, max_value = 10.0),
+                key = "elprice"
+                )
+            self.co2_kWh = self.__hourly_factor_picker(
+                label = "Utslippsfaktor",
+                filename = HOURLY_EMISSION_FILE,
+                number_input = lambda: st.number_input("Velg utslippsfaktor", min_value = 1, step = 5, value = 17, max_value = 200) / 1000000,
+                key = "co2_kWh",
+                scale = 1 / 1000000
+                )
+            tariffs = read_tariffs()
+            self.tariff_name = st.selectbox("Velg nettariff (effektledd)", options = list(tariffs.keys()))
+            self.tariff = tariffs[self.tariff_name]
+
+    def __hourly_factor_picker(self, label, filename, number_input, key, scale = 1):
+        hourly = hourly_series(filename)
+        if hourly is not None and st.toggle(f"{label} time for time ({filename})", value = False, key = f"{key}_hourly"):
+            return HourlyFactor(value = np.mean(hourly) * scale, hourly = hourly, scale = scale)
+        return HourlyFactor(value = number_input())
     
     def adjust_input_parameters_before(self):
         with st.sidebar:
             st.image('src/img/av-logo.png', use_column_width = "auto")
         
     def import_dataframes(self):
-        folder_path = "output"
-        self.temperature_array = import_temperature_array(filename = "input/utetemperatur.xlsx")
-        csv_list, scenario_name_list = read_csv(folder_path = folder_path)
-        df_list, df_hourly_list = [], []
-        for index, filename in enumerate(csv_list):
-            filename_hourly_data = f"{folder_path}/{scenario_name_list[index]}_timedata.csv"
-            df_hourly_data = import_df(filename = rf"{filename_hourly_data}")
-            df_hourly_data['scenario_navn'] = f'{scenario_name_list[index]}'
-            df_hourly_list.append(df_hourly_data)
-            df = import_df(filename = rf"{folder_path}/{filename}")
-            df['scenario_navn'] = f'{scenario_name_list[index]}'
-            df_list.append(df)
-        self.df = pd.concat(df_list, ignore_index=True)
-        self.df_hourly_data = pd.concat(df_hourly_list, ignore_index=True)
-        self.scenario_name_list = scenario_name_list
+        start_warmup() # med serve.py er forvarmingen allerede i gang, ellers starter den med første sesjon
+        projects = read_projects()
+        project_names = list(projects.keys())
+        simulated = available_projects(projects)
+        with st.sidebar:
+            self.project_name = st.selectbox("Velg prosjekt", options = project_names, format_func = lambda name : name if name in simulated else f"{name} (ikke simulert)") if len(project_names) > 1 else project_names[0]
+        self.project = projects[self.project_name]
+        folder_path = self.project["output"]
+        if self.project_name not in simulated:
+            # nye prosjekter har ingen resultater ennå; første kjøring gjøres herfra
+            st.info(f"{self.project_name} er ikke simulert ennå. Kjør energianalysen for å lage resultater i {folder_path}.", icon="ℹ️")
+            if st.button("Kjør energianalyse", key = "kjor_nytt_prosjekt"):
+                run_energyanalysis(self.project)
+                st.rerun()
+            self.progress_bar.progress(100)
+            st.stop()
+        self.catalog = ScenarioCatalog(folder_path = folder_path, project = self.project_name)
+        self.temperature_array = temperature_array(self.catalog, filename = self.project["utetemperatur"])
+        self.scenario_name_list = self.catalog.scenario_names
+        self.dataset_key = self.catalog.dataset_key()
+
+    def show_memory_usage(self):
+        # innlastede data per prosjekt i det felles lageret, de minst nylig brukte kastes når budsjettet er fullt
+        df = self.catalog.cache.metrics()
+        status = start_warmup()
+        with st.sidebar.expander("Minnebruk"):
+            st.caption(f"Budsjett: {df.attrs['budsjett_mb']:,.0f} MB".replace(",", " "))
+            st.caption(f"Forvarming: {'ferdig' if status['ferdig'].is_set() else 'pågår'}, {status['lastet']} ressurser lastet")
+            if "avbrutt" in status:
+                st.caption(f"Forvarmingen stoppet tidlig: {status['avbrutt']} er fullt")
+            for error in status["feil"]:
+                st.caption(f"Feil under forvarming: {error}")
+            st.dataframe(df.round({"minne_mb" : 1, "lastetid" : 1}), hide_index = True, use_container_width = True)
+
+    def map(self, df):
+        import folium
+        from folium.plugins import MarkerCluster, Fullscreen
+        from streamlit_folium import st_folium
+        import geopandas as gpd
+        from shapely.geometry import Polygon
 
-    def map(self, df, scenario_name):
         def create_map():
             center_x = df['x'].mean()
             center_y = df['y'].mean()
-            map = folium.Map(
+            folium_map = folium.Map(
                 location = [center_y, center_x], 
                 zoom_start = 15, 
                 scrollWheelZoom = True, 
@@ -165,9 +184,9 @@ class Dashboard:
                 max_zoom = 22, 
                 control_scale = True
                 )
-            folium.TileLayer('CartoDB positron', name='Bakgrunnskart').add_to(map)
-            folium.TileLayer('https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}', name='Flyfoto', attr = "Flyfoto").add_to(map)
-            return map
+            folium.TileLayer('CartoDB positron', name='Bakgrunnskart').add_to(folium_map)
+            folium.TileLayer('https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}', name='Flyfoto', attr = "Flyfoto").add_to(folium_map)
+            return folium_map
         
         def add_drawing_to_map():
             drawing = folium.plugins.Draw(
@@ -181,8 +200,8 @@ class Dashboard:
                     'polygon' : True
                     }
                 )
-            map.add_child(drawing)
-            drawing.add_to(map)
+            folium_map.add_child(drawing)
+            drawing.add_to(folium_map)
 
         def add_wms_layer_to_map(url, layer, layer_name, opacity = 0.5):
             folium.WmsTileLayer(
@@ -195,7 +214,7 @@ class Dashboard:
                 overlay = True,
                 show = True,
                 opacity = opacity
-                ).add_to(map)
+                ).add_to(folium_map)
             
         def add_marker_cluster_to_map():
             marker_cluster = MarkerCluster(
@@ -205,7 +224,7 @@ class Dashboard:
                 options = {
                     'disableClusteringAtZoom': 13
                     },
-                ).add_to(map)
+                ).add_to(folium_map)
             return marker_cluster
         
         def styling_function(row):
@@ -239,9 +258,8 @@ class Dashboard:
                 <em>{row["profet_bygningstype"]}</em>'''.replace(",", " ")
             return popup_text, tooltip_text, icon
         
-        def add_building_to_marker_cluster(marker_cluster, scenario_name, df):
-            new_df = df.loc[(df['scenario_navn'] == scenario_name)]
-            for index, row in new_df.iterrows():
+        def add_building_to_marker_cluster(marker_cluster, df):
+            for index, row in df.iterrows():
                 popup_text, tooltip_text, icon = styling_function(row) 
                 folium.Marker(
                     [row['y'], row['x']], 
@@ -251,17 +269,17 @@ class Dashboard:
                     ).add_to(marker_cluster)
             
         def add_controls_to_map():
-            Fullscreen().add_to(map)
-            folium.LayerControl(position = "bottomleft").add_to(map)   
-            map.options['attributionControl'] = False 
+            Fullscreen().add_to(folium_map)
+            folium.LayerControl(position = "bottomleft").add_to(folium_map)   
+            folium_map.options['attributionControl'] = False 
 
         def display_map():
             st_map = st_folium(
-                map,
+                folium_map,
                 use_container_width = True,
                 height = 400,
                 #height = 400,
-                returned_objects = ["last_active_drawing"]
+                returned_objects = ["last_active_drawing", "all_drawings"]
                 )
             return st_map
         
@@ -273,10 +291,17 @@ class Dashboard:
                 polygon_gdf = gpd.GeoDataFrame(index = [0], geometry = [polygon])
                 self.filtered_gdf = gpd.sjoin(self.gdf, polygon_gdf, op = 'within')
                 self.filtered_df = pd.DataFrame(self.filtered_gdf.drop(columns='geometry'))
+            # alle tegnede polygoner i én romlig sammenstilling, brukes til sammenligning av områder
+            self.polygon_groups = ()
+            polygons = [Polygon(drawing["geometry"]["coordinates"][0]) for drawing in (st_map.get("all_drawings") or []) if drawing["geometry"]["type"] == "Polygon"]
+            if len(polygons) > 1:
+                polygons_gdf = gpd.GeoDataFrame({"omraade" : range(len(polygons))}, geometry = polygons)
+                df_members = pd.DataFrame(gpd.sjoin(self.gdf, polygons_gdf, op = 'within').drop(columns = 'geometry'))
+                members = df_members.groupby("omraade")["objectid"].apply(lambda object_ids : tuple(sorted(str(object_id) for object_id in object_ids)))
+                self.polygon_groups = tuple(members.get(i, ()) for i in range(len(polygons)))
 
-        #df = df.loc[(df['scenario_navn'] == scenario_name) & (df['bygningsomraadeid'] == self.selected_buildings_option)]
         df = df.loc[(df['bygningsomraadeid'] == self.selected_buildings_option)]
-        map = create_map()
+        folium_map = create_map()
         add_drawing_to_map()
         add_wms_layer_to_map(
             url = "https://geo.ngu.no/mapserver/LosmasserWMS2?request=GetCapabilities&service=WMS",
@@ -292,37 +317,28 @@ class Dashboard:
             )
         add_controls_to_map()
         marker_cluster = add_marker_cluster_to_map()
-        add_building_to_marker_cluster(marker_cluster = marker_cluster, scenario_name = scenario_name, df = df)
+        add_building_to_marker_cluster(marker_cluster = marker_cluster, df = df)
         self.st_map = display_map()
         filter_gdf(self.st_map)
   
-    def df_to_gdf(self, df):
+    def df_to_gdf(self, catalog):
         selected_buildings_option = self.selected_buildings_option
-        self.gdf = convert_df_to_gdf(df, selected_buildings_option)
+        self.gdf = building_gdf(catalog, selected_buildings_option, dataset_key = self.dataset_key)
         
     def get_unique_series_ids(self):
-        self.unique_series_ids = self.df_hourly_data["ID"].unique().tolist()
         self.unique_objectids = list(map(str, self.filtered_gdf["objectid"].unique().tolist()))
-        self.unique_objectids.append("scenario_navn")
-        self.unique_objectids.append("ID")
+        self.selection_cache = SelectionCache(
+            dataset_key = (self.selected_buildings_option, self.dataset_key),
+            selection_key = tuple(sorted(self.unique_objectids)),
+            aggregate_function = self.filter_hourly_data
+            )
 
-    def filter_hourly_data(self, scenario_name):
-        df_results = pd.DataFrame()
-        df = self.df_hourly_data[self.unique_objectids]
-        df = df[df["scenario_navn"] == scenario_name]
-        for id in self.unique_series_ids:
-            df_id = df[df["ID"] == id]
-            df_id = df_id.drop(columns=["scenario_navn", "ID"])
-            df_id = df_id.reset_index(drop = True)
-            df_results[id] = df_id.sum(axis = 1)
-        return df_results
-                
-    def __cleanup_df(self, df):
-        df = df.reset_index(drop = True)
-        df = df.drop(columns = "Unnamed: 0")
-        df.columns = df.columns.str.replace('_', '')
-        df.columns = df.columns.str.replace('energibehov', '')
-        return df
+    def filter_hourly_data(self, scenario_name, object_ids):
+        return self.catalog.hourly(scenario_name).aggregate(object_ids)
+
+    def filter_buildings(self, scenario_name):
+        df = self.catalog.summary(scenario_name, column = 'objectid', values = self.filtered_df['objectid'].tolist())
+        return df.reset_index()
         
     def __rounding_to_int(self, number):
         number = int(round(number,0))
@@ -333,10 +349,10 @@ class Dashboard:
         return number
     
     def __show_map_results(self, key, default_option):
-        scenario_name = "Referansesituasjon"
-        df_buildings = self.filtered_df.loc[self.filtered_df['scenario_navn'] == scenario_name].reset_index()
+        scenario_name = ScenarioCatalog.REFERENCE_SCENARIO
+        df_buildings = self.filter_buildings(scenario_name)
         #--
-        df_results = self.filter_hourly_data(scenario_name)
+        df_results = self.selection_cache.get(scenario_name)
         thermal_array_delivered = df_results["_termisk_energibehov"]
         electric_array_delivered = df_results["_elektrisk_energibehov"]
         spaceheating_array = df_results["_romoppvarming_energibehov"]
@@ -353,7 +369,7 @@ class Dashboard:
         stand_out_color = "#48a23f"
         base_color = "#1d3c34"
         #--
-        tab1, tab2, tab3 = st.tabs(["Levert energi", "Energi- og effektbehov", "Bygningsmassen"])
+        tab1, tab2, tab3, tab4 = st.tabs(["Levert energi", "Energi- og effektbehov", "Bygningsmassen", "Effekttopper"])
         with tab1:
             #with st.expander("Dagens energi- og effektbehov"):
             with st.container():
@@ -467,21 +483,38 @@ class Dashboard:
             )
             st.plotly_chart(fig, use_container_width=True, config = {'displayModeBar': False, 'staticPlot': True})
             #--
+        with tab4:
+            self.__show_peaks(scenario_name = scenario_name, df_buildings = df_buildings, grid_array = grid_array)
         #--            
         
+    def __show_peaks(self, scenario_name, df_buildings, grid_array):
+        # samtidig effekt for utvalget mot summen av hvert byggs egen topp (ikke-samtidig)
+        for season, label in [("vinter", "Vinter"), ("sommer", "Sommer")]:
+            mask = SEASON_MASKS[season]
+            coincident = np.max(grid_array[mask])
+            non_coincident = np.sum(df_buildings[f"_nettutveksling_{season}effekt"])
+            simultaneity = coincident / non_coincident if non_coincident > 0 else 1
+            st.markdown(f"<span style='color:black'><small>{label}: **{self.__rounding_to_int_fixed(coincident, 0):,}** kW samtidig | **{self.__rounding_to_int_fixed(non_coincident, 0):,}** kW ikke-samtidig | samtidighetsfaktor **{simultaneity:.2f}**</span>".replace(",", " "), unsafe_allow_html=True)
+        df_peaks = self.catalog.peaks(scenario_name)
+        if df_peaks is not None:
+            df_peaks = df_peaks.loc[(df_peaks["nivaa"] != BUILDING) & (df_peaks["serie"] == SelectionCache.GRID) & (df_peaks["rang"] == 1)]
+            st.dataframe(df_peaks[["nivaa", "id", "sesong", "time", "effekt", "ikke_samtidig_effekt", "samtidighetsfaktor"]], hide_index = True, use_container_width = True)
+
     def __show_scenario_results(self, key, default_option):
         scenario_name = self.scenario_picker(key, default_option = default_option)
         selected_visual = self.selected_visual
-        df_buildings = self.filtered_df.loc[self.filtered_df['scenario_navn'] == scenario_name].reset_index()
+        df_buildings = self.filter_buildings(scenario_name)
         #--
         
-        df_results = self.filter_hourly_data(scenario_name)
-        thermal_array_delivered = df_results["_termisk_energibehov"]
-        electric_array_delivered = df_results["_elektrisk_energibehov"]
-        spaceheating_array = df_results["_romoppvarming_energibehov"]
-        dhw_array  = df_results["_tappevann_energibehov"]
-        electric_array = df_results["_elspesifikt_energibehov"]
-        grid_array = df_results["_nettutveksling_energi_liste"]
+        df_results = self.selection_cache.get(scenario_name)
+        thermal_array_delivered = df_results[SelectionCache.THERMAL_DEMAND_FOR_CALCULATION]
+        electric_array_delivered = df_results[SelectionCache.ELECTRIC_DEMAND_FOR_CALCULATION]
+        spaceheating_array = df_results[SelectionCache.SPACEHEATING_DEMAND]
+        dhw_array  = df_results[SelectionCache.DHW_DEMAND]
+        electric_array = df_results[SelectionCache.ELECTRIC_DEMAND]
+        grid_array = df_results[SelectionCache.GRID]
+        reference_array = df_results[SelectionCache.REFERENCE]
+        reference_electric_array = df_results[SelectionCache.REFERENCE_ELECTRIC_DEMAND]
         
         #--
         spaceheating_color = "#ff9966"
@@ -531,23 +564,21 @@ class Dashboard:
             st.plotly_chart(fig, use_container_width=True, config = {'displayModeBar': False, 'staticPlot': True})
             #--
         if selected_visual == "Måned":
-            grid_array_sorted = grid_array
-            grid_before_sorted = thermal_array_delivered + electric_array_delivered
             before_color = "#1d3c34"
             after_color = "#48a23f"
             #with st.expander("Dagens energi- og effektbehov"):
             c1, c2 = st.columns(2)
             with c1:
-                st.markdown(f"<span style='color:{before_color}'><small>Før:<br>**{self.__rounding_to_int_fixed(np.sum(thermal_array_delivered + electric_array_delivered), -2):,}** kWh/år<br>**{self.__rounding_to_int_fixed(np.max(thermal_array_delivered), 0):,}** kW</span>".replace(",", " "), unsafe_allow_html=True)
+                st.markdown(f"<span style='color:{before_color}'><small>Før:<br>**{self.__rounding_to_int_fixed(np.sum(reference_array), -2):,}** kWh/år<br>**{self.__rounding_to_int_fixed(np.max(thermal_array_delivered), 0):,}** kW</span>".replace(",", " "), unsafe_allow_html=True)
             with c2:
                 st.markdown(f"<span style='color:{after_color}'><small>Etter<br>**{self.__rounding_to_int_fixed(np.sum(grid_array), -2):,}** kWh/år<br>**{self.__rounding_to_int_fixed(np.max(electric_array_delivered), 0):,}** kW</span>".replace(",", " "), unsafe_allow_html=True)
             
             df_demands = pd.DataFrame(
                 {"Måneder" : ["jan", "feb", "mar", "apr", "mai", "jun", "jul", "aug", "sep", "okt", "nov", "des"],
                 "Etter (kWh/år)" : self.__hour_to_month(grid_array),
-                "Før (kWh/år)" : self.__hour_to_month(thermal_array_delivered + electric_array_delivered),
+                "Før (kWh/år)" : self.__hour_to_month(reference_array),
                 "Etter (kW)" : self.__hour_to_month_max(grid_array),
-                "Før (kW)" : self.__hour_to_month_max(thermal_array_delivered + electric_array_delivered),
+                "Før (kW)" : self.__hour_to_month_max(reference_array),
                 })
             df_demands['Total'] = df_demands.iloc[:, 1:].sum(axis=1)
             fig = go.Figure()
@@ -577,15 +608,16 @@ class Dashboard:
         if selected_visual == "Time for time":
             #with st.expander("Time for time"):
             varighetskurve = st.toggle("Varighetskurve", value = False, key = f"{key}_varighetskurve")
+            full_resolution = st.toggle("Full oppløsning", value = False, key = f"{key}_full_resolution")
             if varighetskurve == True:
-                grid_array_sorted = np.sort(grid_array)[::0]
-                grid_before_sorted = np.sort(thermal_array_delivered + electric_array_delivered)[::0]
+                grid_array_sorted = np.sort(grid_array)[::-1]
+                grid_before_sorted = np.sort(reference_array)[::-1]
             else:
                 grid_array_sorted = grid_array
-                grid_before_sorted = thermal_array_delivered + electric_array_delivered
-            #spaceheating_array_sorted = np.sort(spaceheating_array)[::0]
-            #dhw_array_sorted = np.sort(dhw_array)[::0]
-            #electric_array_sorted = np.sort(electric_array)[::0]
+                grid_before_sorted = reference_array
+            #spaceheating_array_sorted = np.sort(spaceheating_array)[::-1]
+            #dhw_array_sorted = np.sort(dhw_array)[::-1]
+            #electric_array_sorted = np.sort(electric_array)[::-1]
             
             c1, c2 = st.columns(2)
             with c1:
@@ -593,12 +625,14 @@ class Dashboard:
             with c2:
                 st.markdown(f"<span style='color:{stand_out_color}'><small>{scenario_name}<br>**{self.__rounding_to_int_fixed(np.sum(grid_array_sorted), -2):,}** kWh/år (-{100 - self.__rounding_to_int((np.sum(grid_array_sorted)/np.sum(grid_before_sorted))*100)}%)<br>**{self.__rounding_to_int_fixed(np.max(grid_array_sorted), 0):,}** kW (-{100 - self.__rounding_to_int((np.max(grid_array_sorted)/np.max(grid_before_sorted))*100)}%)</span>".replace(",", " "), unsafe_allow_html=True)
             
-            #trace1 = go.Scatter(x=np.arange(len(spaceheating_array_sorted)), y=spaceheating_array_sorted, mode='lines', name='Oppvarming', visible='legendonly', line=dict(color=spaceheating_color))
-            #trace2 = go.Scatter(x=np.arange(len(dhw_array_sorted)), y=dhw_array_sorted, mode='lines', name='Tappevann', visible='legendonly', line=dict(color=dhw_color))
-            #trace3 = go.Scatter(x=np.arange(len(electric_array_sorted)), y=electric_array_sorted, mode='lines', name='Elspesifikt', visible='legendonly', line=dict(color=electricty_color))
+            x_grid, y_grid = downsample(grid_array_sorted, width_px = self.chart_width_px, full_resolution = full_resolution)
+            x_before, y_before = downsample(grid_before_sorted, width_px = self.chart_width_px, full_resolution = full_resolution)
+            #trace1 = go.Scattergl(x=np.arange(len(spaceheating_array_sorted)), y=spaceheating_array_sorted, mode='lines', name='Oppvarming', visible='legendonly', line=dict(color=spaceheating_color))
+            #trace2 = go.Scattergl(x=np.arange(len(dhw_array_sorted)), y=dhw_array_sorted, mode='lines', name='Tappevann', visible='legendonly', line=dict(color=dhw_color))
+            #trace3 = go.Scattergl(x=np.arange(len(electric_array_sorted)), y=electric_array_sorted, mode='lines', name='Elspesifikt', visible='legendonly', line=dict(color=electricty_color))
             if varighetskurve == True:
-                trace4 = go.Scatter(x=np.arange(len(grid_array_sorted)), y=grid_array_sorted, mode='lines', name=f'{scenario_name}', line=dict(color=stand_out_color))
-                trace5 = go.Scatter(x=np.arange(len(grid_before_sorted)), y=grid_before_sorted, mode='lines', name=f'Oppvarming + Tappevann + Elspesifikt', line=dict(color=grid_color, dash = "dash"))
+                trace4 = go.Scattergl(x=x_grid, y=y_grid, mode='lines', name=f'{scenario_name}', line=dict(color=stand_out_color))
+                trace5 = go.Scattergl(x=x_before, y=y_before, mode='lines', name=f'Oppvarming + Tappevann + Elspesifikt', line=dict(color=grid_color, dash = "dash"))
                 layout = go.Layout(
                 xaxis=dict(title='Varighet (timer)'),
                 yaxis=dict(title='Effekt (kW)'),
@@ -608,8 +642,8 @@ class Dashboard:
                 #legend=dict(x=0.5, y=1.0, bgcolor='rgba(255, 255, 255, 0.5)', bordercolor='rgba(0, 0, 0, 0.5)', borderwidth=1)
                 )
             else:
-                trace4 = go.Scatter(x=np.arange(len(grid_array_sorted)), y=grid_array_sorted, mode='lines', name=f'{scenario_name}', line=dict(color=stand_out_color, width = 0.5))
-                trace5 = go.Scatter(x=np.arange(len(grid_before_sorted)), y=grid_before_sorted, mode='lines', name=f'Oppvarming + Tappevann + Elspesifikt', line=dict(color=grid_color, width = 0.5))
+                trace4 = go.Scattergl(x=x_grid, y=y_grid, mode='lines', name=f'{scenario_name}', line=dict(color=stand_out_color, width = 0.5))
+                trace5 = go.Scattergl(x=x_before, y=y_before, mode='lines', name=f'Oppvarming + Tappevann + Elspesifikt', line=dict(color=grid_color, width = 0.5))
                 layout = go.Layout(
                 xaxis=dict(title='Timer i ett år'),
                 yaxis=dict(title='Effekt (kW)'),
@@ -621,19 +655,16 @@ class Dashboard:
             fig = go.Figure(data=[
                 #trace1, trace2, trace3, 
                 trace4, trace5], layout=layout)
-            st.plotly_chart(fig, use_container_width=True, config = {'displayModeBar': False, 'staticPlot': True})
+            st.plotly_chart(fig, use_container_width=True, config = {'displayModeBar': False, 'staticPlot': not full_resolution})
         #--
         if selected_visual == "ET-kurve":
             #with st.expander("ET-kurve"):
-            df = pd.DataFrame(
-                {"Utetemperatur" : self.temperature_array,
-                "Effekt" : grid_array
-                })
-            X = sm.add_constant(df['Utetemperatur'])
-            model = sm.OLS(df['Effekt'], X).fit()
-            st.markdown(f"$$ P = {model.params[0]:.1f} {model.params[1]:.1f} \cdot T $$".replace(".", ","), unsafe_allow_html=True)
-            fig = px.scatter(df, x="Utetemperatur", y="Effekt", trendline="ols")
-            fig.update_traces(line=dict(color=base_color, dash = 'dash'))
+            band = "fyringssesong" if st.toggle("Kun fyringssesong (under 10 °C)", value = False, key = f"{key}_et_band") else "alle"
+            intercept, slope = self.__et_curve(df_buildings = df_buildings, grid_array = grid_array, band = band)
+            st.markdown(f"$$ P = {intercept:.1f} {slope:.1f} \\cdot T $$".replace(".", ","), unsafe_allow_html=True)
+            fig = px.scatter(x=self.temperature_array, y=grid_array, render_mode="webgl")
+            x_line = np.array([np.min(self.temperature_array), np.max(self.temperature_array)])
+            fig.add_trace(go.Scatter(x=x_line, y=intercept + slope * x_line, mode='lines', line=dict(color=base_color, dash = 'dash')))
             fig.update_traces(marker=dict(color=stand_out_color))
             fig.update_layout(
                 showlegend=False,
@@ -645,23 +676,29 @@ class Dashboard:
             st.plotly_chart(fig, use_container_width=True, config = {'displayModeBar': False, 'staticPlot': True})
         if selected_visual == "Økonomi":
             #with st.expander("Økonomi"):
-            reference_array = thermal_array_delivered + electric_array
-            scenario_array = grid_array
-            #--
-            reference_array = reference_array * self.elprice
-            scenario_array = scenario_array * self.elprice
+            reference_cost = self.elprice.total(reference_electric_array)
+            scenario_cost = self.elprice.total(grid_array)
             #--
             st.write("**Strømkostnader**")
             c1, c2 = st.columns(2)
             with c1:
-                st.markdown(f"<span style='color:{grid_color}'><small>Utgangspunkt<br>**{self.__rounding_to_int_fixed(np.sum(reference_array), -2):,}** kr/år".replace(",", " "), unsafe_allow_html=True)
+                st.markdown(f"<span style='color:{grid_color}'><small>Utgangspunkt<br>**{self.__rounding_to_int_fixed(reference_cost, -2):,}** kr/år".replace(",", " "), unsafe_allow_html=True)
             with c2:
-                st.markdown(f"<span style='color:{stand_out_color}'><small>{scenario_name}<br>**{self.__rounding_to_int_fixed(np.sum(scenario_array), -2):,}** kr (-{100 - self.__rounding_to_int((np.sum(scenario_array)/np.sum(reference_array))*100)}%)".replace(",", " "), unsafe_allow_html=True)
+                st.markdown(f"<span style='color:{stand_out_color}'><small>{scenario_name}<br>**{self.__rounding_to_int_fixed(scenario_cost, -2):,}** kr (-{100 - self.__rounding_to_int((scenario_cost/reference_cost)*100)}%)".replace(",", " "), unsafe_allow_html=True)
+            st.write(f"**Effektledd** ({self.tariff_name.lower()})")
+            reference_tariff_cost, reference_demand = self.selection_cache.derived(scenario_name, ("effektledd", "referanse", self.tariff_name), lambda results: capacity_cost(results[SelectionCache.REFERENCE_ELECTRIC_DEMAND], self.tariff))
+            scenario_tariff_cost, scenario_demand = self.selection_cache.derived(scenario_name, ("effektledd", "scenario", self.tariff_name), lambda results: capacity_cost(results[SelectionCache.GRID], self.tariff))
+            c1, c2 = st.columns(2)
+            with c1:
+                st.markdown(f"<span style='color:{grid_color}'><small>Utgangspunkt<br>**{self.__rounding_to_int_fixed(reference_tariff_cost, -2):,}** kr/år<br>**{self.__rounding_to_int_fixed(np.max(reference_demand), 0):,}** kW".replace(",", " "), unsafe_allow_html=True)
+            with c2:
+                st.markdown(f"<span style='color:{stand_out_color}'><small>{scenario_name}<br>**{self.__rounding_to_int_fixed(scenario_tariff_cost, -2):,}** kr/år (-{100 - self.__rounding_to_int((scenario_tariff_cost/reference_tariff_cost)*100)}%)<br>**{self.__rounding_to_int_fixed(np.max(scenario_demand), 0):,}** kW".replace(",", " "), unsafe_allow_html=True)
             st.write("**Investeringskostnader**")
+            # brønnantall og kostnad fra dimensjoneringen per bygg (boreholesizing.py)
             well_meter = np.sum(df_buildings["grunnvarme_meter"].to_numpy())
-            number_of_wells = int(well_meter/300)
-            st.write(f"• Ca. {number_of_wells} brønner á 300 m brønndybde.")
-            gshp_investment_cost = int(well_meter * 600)
+            number_of_wells = int(np.sum(df_buildings["grunnvarme_broenner"].to_numpy())) if "grunnvarme_broenner" in df_buildings else 0
+            st.write(f"• {number_of_wells} brønner, totalt {self.__rounding_to_int_fixed(well_meter, 0):,} m brønndybde.".replace(",", " "))
+            gshp_investment_cost = int(np.sum(df_buildings["grunnvarme_kostnad"].to_numpy())) if "grunnvarme_kostnad" in df_buildings else 0
             st.write(f"• Investeringskostnad brønner: {gshp_investment_cost:,} kr".replace(",", " "))
             solar_panels_produced = int(np.sum(df_buildings["_solcelleproduksjon_sum"].to_numpy()))
             st.write(f"• Investeringskostnad solceller: {solar_panels_produced:,} kr".replace(",", " "))
@@ -669,25 +706,31 @@ class Dashboard:
             st.write(f"• Investeringskostnad solceller: {solar_panels_cost:,} kr".replace(",", " "))
         if selected_visual == "Utslipp":    
             #with st.expander("Utslipp"):
-            reference_array = thermal_array_delivered + electric_array
-            scenario_array = grid_array
-            #--
-            reference_array = reference_array * self.co2_kWh
-            scenario_array = scenario_array * self.co2_kWh
+            reference_emission = self.co2_kWh.total(reference_electric_array)
+            scenario_emission = self.co2_kWh.total(grid_array)
             #--
             st.write("**Utslipp ved strøm**")
             c1, c2 = st.columns(2)
             with c1:
-                st.markdown(f"<span style='color:{grid_color}'><small>Utgangspunkt<br>**{self.__rounding_to_int(np.sum(reference_array)):,}** tonn CO2".replace(",", " "), unsafe_allow_html=True)
+                st.markdown(f"<span style='color:{grid_color}'><small>Utgangspunkt<br>**{self.__rounding_to_int(reference_emission):,}** tonn CO2".replace(",", " "), unsafe_allow_html=True)
             with c2:
-                st.markdown(f"<span style='color:{stand_out_color}'><small>{scenario_name}<br>**{self.__rounding_to_int(np.sum(scenario_array)):,}** tonn CO2 (-{100 - self.__rounding_to_int((np.sum(scenario_array)/np.sum(reference_array))*100)}%)".replace(",", " "), unsafe_allow_html=True)
+                st.markdown(f"<span style='color:{stand_out_color}'><small>{scenario_name}<br>**{self.__rounding_to_int(scenario_emission):,}** tonn CO2 (-{100 - self.__rounding_to_int((scenario_emission/reference_emission)*100)}%)".replace(",", " "), unsafe_allow_html=True)
             
+    def __et_curve(self, df_buildings, grid_array, band):
+        # ET-kurven settes sammen av forhåndsberegnede summer per bygg (sum y og sum x*y)
+        n, sum_x, sum_xx = temperature_statistics(self.temperature_array, band)
+        column_y, column_xy = column_names(SelectionCache.GRID, band)
+        if column_y in df_buildings.columns:
+            sum_y, sum_xy = np.sum(df_buildings[column_y]), np.sum(df_buildings[column_xy])
+        else:
+            sum_y, sum_xy = load_statistics(grid_array, self.temperature_array, band)
+        return fit(n, sum_x, sum_xx, sum_y, sum_xy)
+
     def display_scenario_results(self, df, key, default_option):
         if (len(df)) == 0:
             st.warning('Du er utenfor kartutsnittet', icon="⚠️")
             st.stop()
         else:
-            df = self.__cleanup_df(df = df) # wierd
             self.__show_scenario_results(key = key, default_option = default_option)
             
     def display_map_results(self, df, key, default_option):
@@ -695,13 +738,140 @@ class Dashboard:
             st.warning('Du er utenfor kartutsnittet', icon="⚠️")
             st.stop()
         else:
-            df = self.__cleanup_df(df = df)
             self.__show_map_results(key = key, default_option = default_option)
 
+    def show_overview(self):
+        # oversikt for hele bygningsmassen, hentet fra den forhåndsaggregerte kuben
+        grid_column = f"{SelectionCache.GRID}_sum"
+        df_reference = self.catalog.cube(ScenarioCatalog.REFERENCE_SCENARIO, building_area = self.selected_buildings_option)
+        df_scenario = self.catalog.cube(self.map_scenario_name, building_area = self.selected_buildings_option)
+        if df_reference is None or df_scenario is None:
+            return
+        reference_monthly = df_reference.groupby("maaned")[grid_column].sum()
+        scenario_monthly = df_scenario.groupby("maaned")[grid_column].sum()
+        reference_energy, scenario_energy = np.sum(reference_monthly), np.sum(scenario_monthly)
+        c1, c2 = st.columns(2)
+        with c1:
+            st.markdown(f"<span style='color:#1d3c34'><small>{ScenarioCatalog.REFERENCE_SCENARIO}<br>**{self.__rounding_to_int_fixed(reference_energy, -2):,}** kWh/år</span>".replace(",", " "), unsafe_allow_html=True)
+        with c2:
+            st.markdown(f"<span style='color:#48a23f'><small>{self.map_scenario_name}<br>**{self.__rounding_to_int_fixed(scenario_energy, -2):,}** kWh/år (-{100 - self.__rounding_to_int((scenario_energy/reference_energy)*100)}%)</span>".replace(",", " "), unsafe_allow_html=True)
+        months = ["jan", "feb", "mar", "apr", "mai", "jun", "jul", "aug", "sep", "okt", "nov", "des"]
+        fig = go.Figure()
+        fig.add_trace(go.Bar(x=months, y=reference_monthly.to_numpy(), name='Før (kWh/år)', marker=dict(color="#1d3c34")))
+        fig.add_trace(go.Bar(x=months, y=scenario_monthly.to_numpy(), name='Etter (kWh/år)', marker=dict(color="#48a23f")))
+        fig.update_layout(
+            showlegend=False,
+            margin=dict(b=0, t=0),
+            yaxis=dict(title='Energi (kWh/år)', side='left', showgrid=True, tickformat=",.0f"),
+            height = 200
+        )
+        st.plotly_chart(fig, use_container_width=True, config = {'displayModeBar': False, 'staticPlot': True})
+        df_types = df_scenario.loc[df_scenario["maaned"] == 1]
+        measure_columns = [column for column in df_types.columns if column.startswith("antall_") and column != "antall_bygg"]
+        c1, c2 = st.columns(2)
+        with c1:
+            fig = px.pie(df_types.groupby("profet_bygningstype", as_index = False)["antall_bygg"].sum(), values='antall_bygg', names='profet_bygningstype', color_discrete_sequence=px.colors.qualitative.Set3, hole=0.4)
+            fig.update_traces(textposition='inside', textinfo='label+value')
+            fig.update_layout(showlegend=False, margin=dict(b=0, t=0), height = 200)
+            st.plotly_chart(fig, use_container_width=True, config = {'displayModeBar': False, 'staticPlot': True})
+        with c2:
+            counts = df_types[measure_columns].sum()
+            fig = px.pie(values=counts.to_numpy(), names=[column.replace("antall_", "").capitalize() for column in counts.index], color_discrete_sequence=px.colors.qualitative.Set3, hole=0.4)
+            fig.update_traces(textposition='inside', textinfo='label+value')
+            fig.update_layout(showlegend=False, margin=dict(b=0, t=0), height = 200)
+            st.plotly_chart(fig, use_container_width=True, config = {'displayModeBar': False, 'staticPlot': True})
+        df_groups = self.catalog.group_summary(self.map_scenario_name)
+        if df_groups is not None:
+            with st.expander("Energiområder (samtidig og dimensjonerende effekt)"):
+                df_groups = df_groups.loc[(df_groups["gruppering"] == "energiomraadeid") & (df_groups["serie"].isin([SelectionCache.GRID, "_fjernvarmeproduksjon"]))]
+                st.dataframe(df_groups.drop(columns = [column for column in df_groups.columns if column in ["", "gruppering"]]), hide_index = True, use_container_width = True)
+
+    def show_polygon_comparison(self):
+        groups = self.polygon_groups
+        reference = self.catalog.cached(("områder", self.dataset_key, ScenarioCatalog.REFERENCE_SCENARIO, groups), lambda: compare_polygons(self.catalog, ScenarioCatalog.REFERENCE_SCENARIO, groups))
+        scenario = self.catalog.cached(("områder", self.dataset_key, self.map_scenario_name, groups), lambda: compare_polygons(self.catalog, self.map_scenario_name, groups))
+        df = pd.DataFrame({
+            "Område" : [f"Område {i + 1}" for i in range(len(groups))],
+            "Antall bygg" : [len(group) for group in groups],
+            "Før (kWh/år)" : np.round(reference["referanse_energi"], -2),
+            f"{self.map_scenario_name} (kWh/år)" : np.round(scenario["energi"], -2),
+            "Vintertopp før (kW)" : np.round(reference["vintertopp"], 0),
+            "Vintertopp etter (kW)" : np.round(scenario["vintertopp"], 0),
+            "Sommertopp etter (kW)" : np.round(scenario["sommertopp"], 0),
+        })
+        with st.expander("Sammenlign tegnede områder", expanded = True):
+            st.dataframe(df, hide_index = True, use_container_width = True)
+
+    def ranking_table(self, object_ids):
+        # alle scenarier for utvalget i ett matriseprodukt over scenarioblokken (scenarier x 8760)
+        scenario_names = self.scenario_name_list
+        grid = self.catalog.stacked_hourly(scenario_names, SelectionCache.GRID).aggregate(object_ids)
+        tariff_cost, tariff_demand = capacity_cost(grid, self.tariff)
+        wells = [self.catalog.summary_sums(scenario_name, ["grunnvarme_meter", "grunnvarme_kostnad"], column = 'objectid', values = object_ids) for scenario_name in scenario_names]
+        return pd.DataFrame({
+            "Scenario" : scenario_names,
+            "Levert energi (kWh/år)" : np.round(np.sum(grid, axis = 1), -2),
+            "Vintertopp (kW)" : np.round(np.max(grid[:, SEASON_MASKS["vinter"]], axis = 1), 0),
+            "Sommertopp (kW)" : np.round(np.max(grid[:, SEASON_MASKS["sommer"]], axis = 1), 0),
+            "Strømkostnad (kr/år)" : np.round(self.elprice.total(grid), -2),
+            "Effektledd (kr/år)" : np.round(tariff_cost, -2),
+            "Utslipp (tonn CO2)" : np.round(self.co2_kWh.total(grid), 0),
+            "Brønnmeter (m)" : np.round([well["grunnvarme_meter"] for well in wells], 0),
+            "Brønnkostnad (kr)" : np.round([well["grunnvarme_kostnad"] for well in wells], -3),
+        })
+
+    def show_ranking(self):
+        # hele tabellen bufres per utvalg; bare valg av tariff, strømpris eller utslippsfaktor regner den på nytt
+        key = ("rangering", self.tariff_name, self.elprice.key(), self.co2_kWh.key())
+        df = self.selection_cache.derived(None, key, self.ranking_table)
+        ranking_column = st.selectbox("Ranger etter", options = [column for column in df.columns if column != "Scenario"], key = "ranking_column")
+        df = df.sort_values(ranking_column).reset_index(drop = True)
+        df.insert(0, "Rangering", np.arange(1, len(df) + 1))
+        st.dataframe(df, hide_index = True, use_container_width = True)
+
+    def show_composer(self):
+        # nytt tiltaksmiks for utvalget satt sammen fra forhåndsberegnede endringer per bygg, uten ny simulering
+        measure_deltas = self.catalog.measure_deltas()
+        if measure_deltas is None:
+            st.info("Tiltakskomponisten krever at energianalysen er kjørt på nytt.", icon="ℹ️")
+            return
+        labels = {
+            "grunnvarme" : "Bergvarme",
+            "luft_luft_varmepumpe" : "Luft-luft-varmepumpe",
+            "fjernvarme" : "Fjernvarme",
+            "solceller" : "Solceller",
+            "reduksjon_termiskbehov" : "Redusert termisk behov",
+            "reduksjon_elektriskbehov" : "Redusert elspesifikt behov",
+        }
+        c1, c2 = st.columns([1, 2])
+        with c1:
+            shares = {}
+            for measure in measure_deltas.measures:
+                shares[measure] = st.slider(f"{labels.get(measure, measure)} (%)", min_value = 0, max_value = 100 if measure not in REDUCTION_MEASURES else 50, value = 0, step = 5, key = f"composer_{measure}")
+            seed = st.number_input("Utvalg (tilfeldig frø)", min_value = 0, value = 0, step = 1, key = "composer_seed")
+        reference_array = self.selection_cache.get(ScenarioCatalog.REFERENCE_SCENARIO)[SelectionCache.GRID]
+        delta, counts = measure_deltas.compose(self.unique_objectids, shares, seed)
+        composed_array = reference_array + delta
+        with c2:
+            reference_energy, composed_energy = np.sum(reference_array), np.sum(composed_array)
+            reference_peak, composed_peak = np.max(reference_array[SEASON_MASKS["vinter"]]), np.max(composed_array[SEASON_MASKS["vinter"]])
+            m1, m2 = st.columns(2)
+            with m1:
+                st.metric("Levert energi (kWh/år)", f"{self.__rounding_to_int_fixed(composed_energy, -2):,}".replace(",", " "), delta = f"{self.__rounding_to_int_fixed(composed_energy - reference_energy, -2):,}".replace(",", " "), delta_color = "inverse")
+            with m2:
+                st.metric("Vintertopp (kW)", f"{self.__rounding_to_int(composed_peak):,}".replace(",", " "), delta = f"{self.__rounding_to_int(composed_peak - reference_peak):,}".replace(",", " "), delta_color = "inverse")
+            fig = go.Figure()
+            for name, array, color in [(ScenarioCatalog.REFERENCE_SCENARIO, reference_array, "#1d3c34"), ("Sammensatt", composed_array, "#48a23f")]:
+                x, y = downsample(array, self.chart_width_px)
+                fig.add_trace(go.Scattergl(x = x, y = y, mode = "lines", name = name, line = dict(width = 1, color = color)))
+            fig.update_layout(margin = dict(b = 0, t = 0), height = 300, yaxis = dict(title = "Effekt (kW)"), legend = dict(orientation = "h"))
+            st.plotly_chart(fig, use_container_width = True, config = {'displayModeBar': False, 'staticPlot': True})
+            st.caption(", ".join([f"{labels.get(measure, measure)}: {count} bygg" for measure, count in counts.items()]))
+
     def scenario_picker(self, key, default_label = "Velg scenario", default_option = 0):
         scenario_name = st.selectbox(
             label = default_label, 
-            options = [item for item in self.scenario_name_list if item != "Referansesituasjon"],
+            options = [item for item in self.scenario_name_list if item != ScenarioCatalog.REFERENCE_SCENARIO],
             index = default_option,
             key = f"{key}_scenario"
             )
@@ -713,19 +883,23 @@ class Dashboard:
         self.import_dataframes()
         self.progress_bar.progress(50)
         self.adjust_input_parameters_middle()
-        self.df_to_gdf(df = self.df)
+        self.df_to_gdf(catalog = self.catalog)
+        self.show_memory_usage()
         c1, c2 = st.columns([1, 1])
         with c1:
-            self.map(df = self.df, scenario_name = self.map_scenario_name)
+            self.map(df = self.catalog.summary(self.map_scenario_name, column = 'bygningsomraadeid', values = [self.selected_buildings_option]))
             self.progress_bar.progress(75)
         with c2:
             if self.st_map["last_active_drawing"] == None or self.st_map["last_active_drawing"]["geometry"]["type"] == "Point":
                 st.info('Tegn et polygon for å gjøre et utvalg av bygg.', icon="ℹ️")
+                self.show_overview()
                 self.progress_bar.progress(100)
                 st.stop()
             self.get_unique_series_ids()
         with c2:
             self.display_map_results(df = self.filtered_df, key = "map_results", default_option = 0)
+            if len(self.polygon_groups) > 1:
+                self.show_polygon_comparison()
         #--
         option_list = [
             "Måned",
@@ -734,8 +908,18 @@ class Dashboard:
             "ET-kurve",
             "Utslipp", 
             "Økonomi",
+            "Sett sammen tiltak",
+            "Rangering av scenarier",
             ]
         self.selected_visual = st.selectbox(label = "", options = option_list, label_visibility="collapsed", key = "selectmode")
+        if self.selected_visual == "Sett sammen tiltak":
+            self.show_composer()
+            self.progress_bar.progress(100)
+            st.stop()
+        if self.selected_visual == "Rangering av scenarier":
+            self.show_ranking()
+            self.progress_bar.progress(100)
+            st.stop()
         c1, c2 = st.columns([1, 1])
         with c1:
             self.display_scenario_results(df = self.filtered_df, key = "topleft", default_option = 0)
@@ -751,4 +935,4 @@ if __name__ == "__main__":
     dashboard = Dashboard()
     dashboard.app()
     if st.button("Kjør energianalyse"):
-        run_energyanalysis()
\ No newline at end of file
+        run_energyanalysis(dashboard.project)
\ No newline at end of file
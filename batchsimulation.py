@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+from peakanalysis import SEASON_MASKS
+from boreholesizing import size_boreholes
+
+def coverage_cap(matrix, coverage):
+    # Kapper hver rad (bygg x timer) ved effekten som gir ønsket energidekningsgrad (%).
+    # Eksakt løsning via sortert kumulativ sum i stedet for bisection per bygg.
+    matrix = np.nan_to_num(np.atleast_2d(np.asarray(matrix, dtype = float)))
+    coverage = np.broadcast_to(np.asarray(coverage, dtype = float), matrix.shape[:1])
+    n = matrix.shape[1]
+    sorted_matrix = np.sort(matrix, axis = 1)
+    cumulative = np.concatenate([np.zeros((matrix.shape[0], 1)), np.cumsum(sorted_matrix, axis = 1)], axis = 1)
+    # energi dekket hvis kappet ved sortert verdi k: sum av verdiene under + verdien * antall timer over
+    covered = cumulative[:, :-1] + sorted_matrix * (n - np.arange(n))
+    target = cumulative[:, -1] * coverage / 100
+    k = np.minimum(np.sum(covered < target[:, None], axis = 1), n - 1)
+    rows = np.arange(matrix.shape[0])
+    cutoff = (target - cumulative[rows, k]) / (n - k)
+    cutoff = np.where(coverage >= 100, np.inf, cutoff)
+    return np.minimum(matrix, cutoff[:, None])
+
+# SN-NSPEK 3031:2023 tabell K.13, relativ effekt og COP ved -15, 2 og 7 grader
+ASHP_TEMPERATURES = [-15, 2, 7]
+ASHP_P_3031 = np.array([
+    [0.46, 0.72, 1],
+    [0.23, 0.36, 0.5],
+    [0.09, 0.14, 0.2]
+    ])
+ASHP_COP_3031 = np.array([
+    [0.44, 0.53, 0.64],
+    [0.61, 0.82, 0.9],
+    [0.55, 0.68, 0.82]
+    ])
+ASHP_MIN_TEMPERATURE = -15
+
+SWEEP_DEFAULTS = {
+    "dekningsgrad_grunnvarme" : 95,
+    "cop_grunnvarme" : 3.5,
+    "cop_nominell_luft" : 5,
+    "maks_effekt_luft" : 10,
+    "effektdekning_luft" : 40,
+    "kostnad_per_meter" : 600,
+}
+
+def ashp_tables(temperature, cop_nominal = 1):
+    # -> relativ effekt (8760 x 3), COP (8760 x 3) og interpolert COP (8760) per time.
+    # Flere værår kan gis som (år x 1 x 8760) og kringkastes da mot (år x bygg x 8760).
+    temperature = np.asarray(temperature, dtype = float)
+    p_fit = [np.polyfit(x = ASHP_TEMPERATURES, y = row, deg = 1) for row in ASHP_P_3031]
+    cop_fit = [np.polyfit(x = ASHP_TEMPERATURES, y = row, deg = 1) for row in ASHP_COP_3031]
+    p_hp = np.stack([np.polyval(fit, temperature) for fit in p_fit], axis = -1)
+    cop_hp = np.stack([np.polyval(fit, temperature) for fit in cop_fit], axis = -1) * cop_nominal
+    return p_hp, cop_hp, np.mean(cop_hp, axis = -1)
+
+def ashp_supply(thermal, temperature, p_nominal, tables):
+    # thermal: (... x bygg x 8760), p_nominal: (... x bygg) -> levert fra varmepumpe og COP (relativ til nominell COP)
+    p_hp, cop_hp, interpolated = tables
+    p_nominal = np.asarray(p_nominal, dtype = float)[..., None]
+    upper = p_hp[..., 0] * p_nominal
+    lower = p_hp[..., 2] * p_nominal
+    running = np.asarray(temperature, dtype = float) >= ASHP_MIN_TEMPERATURE
+    supply = np.where(running, np.minimum(thermal, upper), 0)
+    cop = np.where(thermal >= upper, cop_hp[..., 0], np.where(thermal <= lower, cop_hp[..., 2], interpolated))
+    return supply, np.where(running, cop, 1)
+
+def parameter_grid(**values):
+    # alle kombinasjoner av oppgitte verdier, standardverdier for resten
+    columns = list(SWEEP_DEFAULTS.keys())
+    axes = [np.atleast_1d(values.get(column, SWEEP_DEFAULTS[column])) for column in columns]
+    mesh = np.meshgrid(*axes, indexing = "ij")
+    return pd.DataFrame({column : axis.ravel() for column, axis in zip(columns, mesh)})
+
+def parameter_sweep(base, thermal, gshp, ashp, temperature, grid):
+    # base: (bygg x 8760) nettutveksling uten varmepumper, thermal: termisk behov, gshp/ashp: boolske masker.
+    # De ikke-lineære stegene (dekningsgrad, effektbegrensning) beregnes én gang per unike verdi,
+    # COP og kostnad er lineære og kringkastes over alle kombinasjoner.
+    grid = grid.reset_index(drop = True)
+    thermal = np.nan_to_num(thermal)
+    base_total = np.nan_to_num(base).sum(axis = 0)
+    n = len(grid)
+
+    coverages, coverage_index = np.unique(grid["dekningsgrad_grunnvarme"].to_numpy(dtype = float), return_inverse = True)
+    gshp_supply = np.array([coverage_cap(thermal[gshp], coverage) for coverage in coverages]).reshape(len(coverages), -1, 8760)
+    gshp_series = gshp_supply.sum(axis = 1)
+    cop_gshp = grid["cop_grunnvarme"].to_numpy(dtype = float)
+    source_fraction = 1 - 1 / cop_gshp
+
+    tables = ashp_tables(temperature)
+    ashp_keys = grid[["maks_effekt_luft", "effektdekning_luft"]].to_numpy(dtype = float)
+    ashp_unique, ashp_index = np.unique(ashp_keys, axis = 0, return_inverse = True)
+    ashp_index = np.ravel(ashp_index)
+    ashp_series = np.zeros((len(ashp_unique), 8760))
+    ashp_compressor_relative = np.zeros((len(ashp_unique), 8760))
+    thermal_ashp = thermal[ashp]
+    for i, (p_max, power_coverage) in enumerate(ashp_unique):
+        p_nominal = np.minimum(np.max(thermal_ashp, axis = 1, initial = 0) * power_coverage / 100, p_max)
+        supply, cop = ashp_supply(thermal_ashp, temperature, p_nominal, tables)
+        ashp_series[i] = supply.sum(axis = 0)
+        ashp_compressor_relative[i] = (supply / cop).sum(axis = 0)
+    cop_ashp = grid["cop_nominell_luft"].to_numpy(dtype = float)
+
+    gshp_from_source = gshp_series[coverage_index] * source_fraction[:, None]
+    ashp_compressor = ashp_compressor_relative[ashp_index] / cop_ashp[:, None]
+    total = base_total[None, :] - gshp_from_source - ashp_series[ashp_index] + ashp_compressor
+    # brønnlengde avhenger ikke-lineært av lasten, så den beregnes én gang per unike (dekningsgrad, COP)
+    well_keys, well_index = np.unique(np.stack([coverage_index, cop_gshp], axis = 1), axis = 0, return_inverse = True)
+    well_meters = np.array([size_boreholes(gshp_supply[int(index)] * (1 - 1 / cop))[0].sum() for index, cop in well_keys])
+    well_meter = well_meters[np.ravel(well_index)]
+
+    df = grid.copy()
+    df["nettutveksling_energi"] = total.sum(axis = 1)
+    df["nettutveksling_effekt"] = np.max(total, axis = 1)
+    for season, mask in SEASON_MASKS.items():
+        if season != "aar":
+            df[f"nettutveksling_{season}effekt"] = np.max(total[:, mask], axis = 1)
+    df["kompressor_energi"] = (gshp_series[coverage_index].sum(axis = 1) - gshp_from_source.sum(axis = 1)) + ashp_compressor.sum(axis = 1)
+    df["spisslast_energi"] = thermal[gshp].sum() + thermal_ashp.sum() - gshp_series[coverage_index].sum(axis = 1) - ashp_series[ashp_index].sum(axis = 1)
+    df["levert_fra_kilde_energi"] = gshp_from_source.sum(axis = 1)
+    df["brønnmeter"] = well_meter
+    df["grunnvarme_kostnad"] = well_meter * grid["kostnad_per_meter"].to_numpy(dtype = float)
+    return df
@@ -0,0 +1,76 @@
+import functools
+import numpy as np
+from scipy.special import erf
+
+# Dimensjonering av brønnpark: timelast fra _levert_fra_kilde foldes med brønnparkens g-funksjon (endelig linjekilde,
+# Claesson & Javed) via FFT. Lasten gjentas hvert år, så responsen i siste år er en sirkulær konvolusjon
+# med impulsresponsen summert over alle driftsår.
+GROUND_CONDUCTIVITY = 3.5 # W/mK
+GROUND_DIFFUSIVITY = 3.5 / 2.16e6 * 3600 # m2/time
+UNDISTURBED_TEMPERATURE = 7 # grader
+MIN_FLUID_TEMPERATURE = -2 # grader, laveste tillatte middeltemperatur i kollektorvæsken
+BOREHOLE_RESISTANCE = 0.08 # mK/W
+BOREHOLE_RADIUS = 0.0575 # m
+BOREHOLE_SPACING = 15 # m
+MAX_DEPTH = 300 # m per brønn
+MAX_BOREHOLES = 30
+YEARS = 25
+COST_PER_METER = 600 # kr/m
+
+def _ierf(x):
+    return x * erf(x) - (1 - np.exp(-x ** 2)) / np.sqrt(np.pi)
+
+def field_positions(n_boreholes, spacing = BOREHOLE_SPACING):
+    # tilnærmet kvadratisk rutenett, fylt rad for rad
+    columns = int(np.ceil(np.sqrt(n_boreholes)))
+    index = np.arange(n_boreholes)
+    return np.stack([index % columns, index // columns], axis = 1) * spacing
+
+def g_function(hours, n_boreholes, depth = MAX_DEPTH, spacing = BOREHOLE_SPACING):
+    # g(t) for brønnparken, midlet over alle brønner: delta T = q / (2 pi k H_brønn) * g
+    positions = field_positions(n_boreholes, spacing)
+    distances = np.sqrt(np.sum((positions[:, None, :] - positions[None, :, :]) ** 2, axis = 2))
+    distances = np.where(distances == 0, BOREHOLE_RADIUS, distances)
+    unique_distances, counts = np.unique(np.round(distances, 6), return_counts = True)
+    # integral fra s0 = 1 / sqrt(4 a t) til uendelig, én kumulativ sum på logaritmisk s-akse per avstand
+    s = np.logspace(np.log10(1 / np.sqrt(4 * GROUND_DIFFUSIVITY * hours[-1] * 10)), np.log10(10 / BOREHOLE_RADIUS), 4000)
+    s0 = 1 / np.sqrt(4 * GROUND_DIFFUSIVITY * np.asarray(hours, dtype = float))
+    g = np.zeros(len(s0))
+    y = 4 * _ierf(depth * s) - _ierf(2 * depth * s)
+    for distance, count in zip(unique_distances, counts):
+        integrand = 0.5 * np.exp(-(distance * s) ** 2) * y / (depth * s ** 2)
+        tail = np.concatenate([np.cumsum(((integrand[1:] + integrand[:-1]) / 2 * np.diff(s))[::-1])[::-1], [0]])
+        g += count * np.interp(s0, s, tail)
+    return g / n_boreholes
+
+@functools.lru_cache(maxsize = None)
+def folded_response(n_boreholes, depth = MAX_DEPTH, spacing = BOREHOLE_SPACING, years = YEARS):
+    # rfft av impulsresponsen summert over driftsårene, bufret per geometri
+    log_hours = np.logspace(0, np.log10(years * 8760), 300)
+    hours = np.arange(1, years * 8760 + 1)
+    step = np.interp(np.log(hours), np.log(log_hours), g_function(log_hours, n_boreholes, depth, spacing))
+    impulse = np.diff(np.concatenate([[0], step]))
+    return np.fft.rfft(impulse.reshape(years, 8760).sum(axis = 0))
+
+def required_length(load, n_boreholes, depth = MAX_DEPTH):
+    # load: (bygg x 8760) uttak fra brønnene i W -> nødvendig total brønnlengde i meter
+    response = np.fft.irfft(np.fft.rfft(load, axis = 1) * folded_response(n_boreholes, depth), n = 8760, axis = 1)
+    temperature_drop = response / (2 * np.pi * GROUND_CONDUCTIVITY) + load * BOREHOLE_RESISTANCE
+    return np.max(temperature_drop, axis = 1) / (UNDISTURBED_TEMPERATURE - MIN_FLUID_TEMPERATURE)
+
+def size_boreholes(extraction, cost_per_meter = COST_PER_METER, max_boreholes = MAX_BOREHOLES, depth = MAX_DEPTH):
+    # extraction: (bygg x 8760) kW hentet fra grunnen -> brønnmeter, antall brønner og kostnad per bygg
+    load = np.abs(np.nan_to_num(np.atleast_2d(extraction))) * 1000
+    meters = np.zeros(len(load))
+    boreholes = np.zeros(len(load), dtype = int)
+    remaining = np.flatnonzero(load.any(axis = 1))
+    for n_boreholes in range(1, max_boreholes + 1):
+        if len(remaining) == 0:
+            break
+        length = required_length(load[remaining], n_boreholes, depth)
+        fits = (length <= n_boreholes * depth) | (n_boreholes == max_boreholes)
+        meters[remaining[fits]] = length[fits]
+        boreholes[remaining[fits]] = n_boreholes
+        remaining = remaining[~fits]
+    meters = np.round(meters, 0)
+    return meters, boreholes, np.round(meters * cost_per_meter, 0)
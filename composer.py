@@ -0,0 +1,52 @@
+import json
+import numpy as np
+from portfolio import HEATING_MEASURES
+
+# Timevis endring i hvert byggs nettutveksling per tiltak, relativt til referansen. Et nytt tiltaksmiks for et
+# utvalg settes sammen ved å summere endringene for et tilfeldig (seedet) utvalg av byggene, uten ny simulering.
+DELTAS_SUFFIX = "_tiltaksdeltaer.npy"
+INDEX_SUFFIX = "_tiltaksdeltaer.json"
+# prosentvise reduksjoner gjelder alle bygg i utvalget, deltaen er per prosentpoeng
+REDUCTION_MEASURES = ["reduksjon_termiskbehov", "reduksjon_elektriskbehov"]
+
+def write_measure_deltas(folder_path, scenario_name, object_ids, deltas):
+    # deltas: {tiltak: (bygg x 8760)} -> (tiltak x bygg x 8760) float32 som kan minnemappes
+    measures = list(deltas.keys())
+    np.save(f"{folder_path}/{scenario_name}{DELTAS_SUFFIX}", np.stack([deltas[measure] for measure in measures]).astype(np.float32))
+    with open(f"{folder_path}/{scenario_name}{INDEX_SUFFIX}", "w", encoding = "utf-8") as f:
+        json.dump({"objectid" : [str(object_id) for object_id in object_ids], "tiltak" : measures}, f, ensure_ascii = False)
+
+class MeasureDeltas:
+    def __init__(self, deltas_filename, index_filename):
+        with open(index_filename, encoding = "utf-8") as f:
+            index = json.load(f)
+        self.measures = index["tiltak"]
+        self.column_index = {object_id : i for i, object_id in enumerate(index["objectid"])}
+        self.block = np.load(deltas_filename, mmap_mode = "r")
+
+    def columns(self, object_ids):
+        return sorted(self.column_index[object_id] for object_id in object_ids if object_id in self.column_index)
+
+    def compose(self, object_ids, shares, seed = 0):
+        # shares: {tiltak: prosent} -> samlet endring (8760) og antall bygg per tiltak
+        rng = np.random.default_rng(seed)
+        columns = self.columns(object_ids)
+        total = np.zeros(8760)
+        has_heating = np.zeros(len(columns), dtype = bool)
+        counts = {}
+        for measure, share in shares.items():
+            if share == 0 or measure not in self.measures:
+                continue
+            block = np.asarray(self.block[self.measures.index(measure), columns], dtype = float)
+            if measure in REDUCTION_MEASURES:
+                total += share * block.sum(axis = 0)
+                counts[measure] = len(columns)
+                continue
+            blocked = has_heating if measure in HEATING_MEASURES else np.zeros_like(has_heating)
+            eligible = np.flatnonzero(block.any(axis = 1) & ~blocked)
+            chosen = rng.choice(eligible, size = int(share / 100 * len(eligible)), replace = False)
+            total += block[chosen].sum(axis = 0)
+            if measure in HEATING_MEASURES:
+                has_heating[chosen] = True
+            counts[measure] = len(chosen)
+        return total, counts
@@ -0,0 +1,48 @@
+import os
+import numpy as np
+
+POINTS_PER_PIXEL = 2
+# bredden på innholdet i "wide"-oppsettet; kan settes per installasjon (skjermene dashboardet vises på)
+PAGE_WIDTH_ENVIRONMENT_VARIABLE = "ENERGIANALYSE_SIDEBREDDE_PX"
+DEFAULT_PAGE_WIDTH_PX = 1400
+COLUMN_GAP_PX = 32
+
+def chart_width(columns = 1):
+    # grafene fyller kolonnen de står i (use_container_width), så bredden følger av sidebredden og antall kolonner
+    page_width = int(os.environ.get(PAGE_WIDTH_ENVIRONMENT_VARIABLE, DEFAULT_PAGE_WIDTH_PX))
+    return max(100, (page_width - (columns - 1) * COLUMN_GAP_PX) // columns)
+
+def points_for_width(width_px, n_points):
+    return int(min(n_points, max(3, width_px * POINTS_PER_PIXEL)))
+
+def lttb(y, n_out, x = None):
+    # Largest-Triangle-Three-Buckets: beholder formen (og toppene) på kurven med n_out punkter
+    y = np.nan_to_num(np.asarray(y, dtype = float))
+    n = len(y)
+    if x is None:
+        x = np.arange(n)
+    x = np.asarray(x, dtype = float)
+    if n_out >= n or n_out < 3:
+        return x, y
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.zeros(n_out, dtype = int)
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+        else:
+            next_start, next_end = n - 1, n
+        x_avg = x[next_start:next_end].mean()
+        y_avg = y[next_start:next_end].mean()
+        area = np.abs((x[a] - x_avg) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (y_avg - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return x[selected], y[selected]
+
+def downsample(y, width_px, full_resolution = False):
+    if full_resolution:
+        y = np.asarray(y, dtype = float)
+        return np.arange(len(y)), y
+    return lttb(y, points_for_width(width_px, len(y)))
@@ -1,12 +1,23 @@
+import os
+import json
 import pandas as pd
 import numpy as np
-from requests_oauthlib import OAuth2Session
-from oauthlib.oauth2 import BackendApplicationClient
 import time
 import random
-import swifter
-import streamlit as st
-from sklearn.linear_model import LinearRegression
+from scenariocatalog import write_manifest_entry, manifest_hash, BASIS_SUFFIX
+from etcurve import TEMPERATURE_BANDS, load_statistics, column_names
+from peakanalysis import SEASON_MASKS, WHOLE_AREA, peak_analysis
+from rollupcube import rollup_cube
+from aggregation import membership_matrix, user_groupings, group_summary, to_timedata, aggregate
+from superposition import basis_matrix, compress
+from metereddata import MeteredData, CACHE_FILE, REPORT_FILE
+from batchsimulation import SWEEP_DEFAULTS, coverage_cap, ashp_tables, ashp_supply, parameter_sweep
+from storage import storage_parameters, run_storage, storage_summary
+from composer import write_measure_deltas
+from portfolio import HEATING_MEASURES, measure_cost, greedy_portfolio
+from boreholesizing import size_boreholes
+from weatherensemble import weather_files, read_weather_years, profile_cache_file, profile_stack, heat_pump_balance, ensemble_report
+from scenariospec import load_scenarios, scenario_hash, source_signature, data_hash, SPEC_FILE
 
 class EnergyAnalysis:
     PROFET_BUILDINGSTANDARD = "profet_bygningsstandard"
@@ -28,8 +39,6 @@ class EnergyAnalysis:
             "Passivhus": "Vef"
             }
     
-    PROFET_DATA = pd.read_csv('src/profet_data.csv', sep = ";")
-
     GSHP = 'grunnvarme'
     SOLAR_PANELS = 'solceller'
     ASHP = 'luft_luft_varmepumpe'
@@ -57,7 +66,13 @@ class EnergyAnalysis:
     HAS_ADDRESS = 'har_adresse'
     HAS_EXISTING_DATA = 'har_eksisterende_data'
     
-    SOLARPANEL_DATA = pd.read_csv('src/solenergi_antakelser.csv', sep = ";")
+    PROFET_DATA_FILE = 'src/profet_data.csv'
+    SOLARPANEL_DATA_FILE = 'src/solenergi_antakelser.csv'
+    COMPRESS_HOURLY_DATA = True
+    # optimerte scenarier, f.eks. {"navn" : "Optimert vintertopp -20%", "maal" : "vintereffekt", "reduksjon" : 20}
+    OPTIMIZATION_TARGETS = []
+    # lager på nettutvekslingen, f.eks. {"type" : "batteri", "styring" : "topplastkutt"} (se storage.py), None = av
+    STORAGE = None
     
     BUILDING_TYPES = {
             "Hus": "Hou",
@@ -119,12 +134,17 @@ class EnergyAnalysis:
             'Andre' : 'Næringsbygg_mindre',
         }
     
-    def __init__(self, building_table, energy_area_id, building_area_id, scenario_file_name, temperature_array_file_path):
+    def __init__(self, building_table, energy_area_id, building_area_id, scenario_file_name, temperature_array_file_path, output_folder = "output"):
         self.BUILDING_TABLE = building_table
         self.ENERGY_AREA_ID = energy_area_id
         self.BUILDING_AREA_ID = building_area_id
         self.SCENARIO_FILE_NAME = scenario_file_name
         self.TEMPERATURE_ARRAY_FILE_NAME = temperature_array_file_path
+        self.OUTPUT_FOLDER = output_folder # egen mappe per prosjekt, se projects.py
+        self.weather_years, self.weather_profiles = {}, {}
+        self.rng = random.Random()
+        # profiler leses først når analysen kjøres, ikke når modulen importeres
+        self.SOLARPANEL_DATA = pd.read_csv(self.SOLARPANEL_DATA_FILE, sep = ";")
                 
     def __lower_column_names(self, df):
         df.rename(columns=lambda x: x.lower(), inplace=True)
@@ -225,6 +245,9 @@ class EnergyAnalysis:
         keys = list(df.keys())
         keys.pop(0)
         self.address_keys = keys
+        # alle målerserier leses, valideres og splittes én gang (mellomlagret i prosjektets output-mappe)
+        self.metered_data = MeteredData(f"input/{self.BUILDING_TABLE}", self.address_dict, self.address_keys,
+            cache_file = f"{self.OUTPUT_FOLDER}/{os.path.basename(CACHE_FILE)}", report_file = f"{self.OUTPUT_FOLDER}/{os.path.basename(REPORT_FILE)}")
         #for key in keys:
         #    st.write(key)
         #    st.write(df[key])
@@ -242,25 +265,14 @@ class EnergyAnalysis:
         df = self.__area_sort(df)            
         return df
     
-    def __read_scenario_file_excel(self):
-        variable_dict = {}
-        xls_keys = list(pd.read_excel(self.SCENARIO_FILE_NAME, sheet_name = None).keys())
-        for key in xls_keys:
-            df = pd.read_excel(self.SCENARIO_FILE_NAME, sheet_name = key, index_col=0)
-            df = df.T
-            energy_dicts = df.to_dict()
-            variable_dict[key] = energy_dicts
-        energy_dicts_of_dicts = []
-        for i in range(0, len(variable_dict)):
-            energy_dicts_of_dicts.append(variable_dict[xls_keys[i]])
-        return energy_dicts_of_dicts, xls_keys
-          
     def __get_secret(self, filename):
         with open(filename) as file:
             secret = file.readline()
         return secret
         
     def __profet_api(self, building_standard, building_type, area, temperature_array):
+        from requests_oauthlib import OAuth2Session
+        from oauthlib.oauth2 import BackendApplicationClient
         oauth = OAuth2Session(client=BackendApplicationClient(client_id="profet_2023"))
         predict = OAuth2Session(
             token=oauth.fetch_token(
@@ -305,7 +317,7 @@ class EnergyAnalysis:
         else:
             raise TypeError("PROFet virker ikke")
         
-    def preprocess_profet_data(self, temperature_array):
+    def preprocess_profet_data(self, temperature_array, filename = PROFET_DATA_FILE):
         result_df = pd.DataFrame()
         for building_type in self.BUILDING_TYPES:
             for building_standard in self.BUILDING_STANDARDS:
@@ -316,62 +328,32 @@ class EnergyAnalysis:
                 result_df[dhw_col_name] = dhw_demand.flatten()
                 result_df[spaceheating_col_name] = spaceheating_demand.flatten()
                 result_df[electric_col_name] = electric_demand.flatten()
-        result_df.to_csv("src/profet_data.csv", sep = ";")
+        result_df.to_csv(filename, sep = ";")
         return result_df
     
+    def profet_profiles(self, temperature_array):
+        # PROFET-profiler per temperaturår, hentes bare én gang per unike temperaturserie
+        filename = profile_cache_file(temperature_array)
+        if os.path.exists(filename):
+            return pd.read_csv(filename, sep = ";")
+        return self.preprocess_profet_data(temperature_array = list(temperature_array), filename = filename)
+    
     def preprocess_luft_luft_varmepumpe(self, temperature_array):
         COP_NOMINAL = 5  # Nominell COP
-        temperature_datapoints = [-15, 2, 7] # SN- NSPEK 3031:2023 - tabell K.13
-        P_3031 = np.array([
-            [0.46, 0.72, 1],
-            [0.23, 0.36, 0.5],
-            [0.09, 0.14, 0.2]
-            ])
-        COP_3031 = np.array([
-            [0.44, 0.53, 0.64],
-            [0.61, 0.82, 0.9],
-            [0.55, 0.68, 0.82]
-            ])
-        P_3031_list = []
-        COP_3031_list = []
-        for i in range(0, len(temperature_datapoints)):
-            P_3031_list.append(np.polyfit(x = temperature_datapoints, y = P_3031[i], deg = 1))
-            COP_3031_list.append(np.polyfit(x = temperature_datapoints, y = COP_3031[i], deg = 1))
-
-        self.P_HP_DICT = []
-        self.COP_HP_DICT = []
-        self.INTERPOLATE_HP_DICT = []
-        for index, outdoor_temperature in enumerate(temperature_array):
-            p_hp_list = np.array([np.polyval(P_3031_list[0], outdoor_temperature), np.polyval(P_3031_list[1], outdoor_temperature), np.polyval(P_3031_list[2], outdoor_temperature)])
-            cop_hp_list = np.array([np.polyval(COP_3031_list[0], outdoor_temperature), np.polyval(COP_3031_list[1], outdoor_temperature), np.polyval(COP_3031_list[2], outdoor_temperature)]) * COP_NOMINAL
-            interpolate_hp_list = np.polyfit(x = p_hp_list, y = cop_hp_list, deg = 0)[0]
-            #--
-            self.P_HP_DICT.append(p_hp_list)
-            self.COP_HP_DICT.append(cop_hp_list)
-            self.INTERPOLATE_HP_DICT.append(interpolate_hp_list)
+        p_hp, cop_hp, interpolate_hp = ashp_tables(temperature = temperature_array, cop_nominal = COP_NOMINAL) # SN- NSPEK 3031:2023 - tabell K.13
+        self.P_HP_DICT = list(p_hp)
+        self.COP_HP_DICT = list(cop_hp)
+        self.INTERPOLATE_HP_DICT = list(interpolate_hp)
             
     def __load_temperature_array(self):
         array = pd.read_excel(self.TEMPERATURE_ARRAY_FILE_NAME).to_numpy()
         array = array.flatten().tolist()
         self.temperature_array = array
-        self.WINTER_MAX = np.argmax(array)
-        self.SUMMER_MAX = 5000
         return array
     
-    def __string_percentage(self, string):
-        if len(string) == 2:
-            number = int(f"{string[1]}")
-        elif len(string) == 3:
-            number = int(f"{string[1]}{string[2]}")
-        elif len(string) == 4:
-            number = int(f"{string[1]}{string[2]}{string[3]}")
-            if number > 100:
-                raise TypeError("Prosent kan ikke være over 100%")
-        return number
-    
-    def modify_scenario(self, df, energy_dicts):
+    def modify_scenario(self, df, shares, seed = None):
         table_no_entries = df.loc[(df[self.GSHP] == 0) & (df[self.DISTRICT_HEATING] == 0) & (df[self.ASHP] == 0) & (df[self.SOLAR_PANELS] == 0)]
-        new_df = self.create_scenario(df = table_no_entries, energy_dicts = energy_dicts)
+        new_df = self.create_scenario(df = table_no_entries, shares = shares, seed = seed)
         df = pd.concat([new_df, df])
         df = df.drop_duplicates(subset=self.OBJECT_ID, keep="first")
         df = df.sort_values(self.OBJECT_ID).reset_index(drop=True)
@@ -385,48 +367,28 @@ class EnergyAnalysis:
         return number
         #return round((number / (1000 * 1000)), 10)
         
-    def __predict_heating_demand(self, demand, temperature):
-        #data = pd.DataFrame({'Demand': demand, 'Temperature': temperature})
-        #filtered_data = data[data['Temperature'] < 10]
-        #model = LinearRegression()
-        #model.fit(filtered_data[['Temperature']], filtered_data['Demand'])
-        #predicted_demand = model.predict(data[['Temperature']])
-        #data['Predicted_Demand'] = predicted_demand
-        #data['Heating_Demand'] = data['Demand'] - data['Predicted_Demand']
-        #data['Heating_Demand'] = np.where(data['Heating_Demand'] < 0, 0, data['Heating_Demand'])
-        #heating_related_demand = data['Heating_Demand']
-        electric_related_demand = self.__dekningsgrad_calculation(dekningsgrad = 50, timeserie = demand)
-        if np.sum(demand - electric_related_demand) < 100:
-            electric_related_demand = demand * 0.5
-        heating_related_demand = demand - electric_related_demand
-        return heating_related_demand, electric_related_demand
-
     def demand_calculation_simplified(self, row):
+        if row[self.HAS_EXISTING_DATA] == True:
+            # målte data er validert og splittet på forhånd, se metereddata.py
+            heat_production, power_production, heating_related_demand, electric_related_demand = self.metered_data.demand(row[self.HAS_ADDRESS])
+            thermal_demand_for_calculation = heating_related_demand #+ heat_production
+            electric_demand_for_calculation = electric_related_demand
+            electric_demand = electric_related_demand + power_production
+            spaceheating_demand = heating_related_demand
+            dhw_demand = heat_production
+            thermal_demand_for_calculation = thermal_demand_for_calculation - (thermal_demand_for_calculation/100)*row[self.REDUCE_THERMAL_DEMAND]
+            electric_demand_for_calculation = electric_demand_for_calculation - (electric_demand_for_calculation/100)*row[self.REDUCE_ELECTRIC_DEMAND]
+            return thermal_demand_for_calculation, electric_demand_for_calculation, spaceheating_demand, dhw_demand, electric_demand
         try:
-            if row[self.HAS_EXISTING_DATA] == True:
-                #--
-                existing_data_df = self.address_dict[row[self.HAS_ADDRESS]]
-                heat_production = existing_data_df["Varmeproduksjon"].to_numpy()
-                power_production = existing_data_df["Strømproduksjon"].to_numpy()
-                # ml
-                grid_array = existing_data_df["Levert energi til bygg (strømmåler)"].to_numpy()
-                heating_related_demand, electric_related_demand = self.__predict_heating_demand(demand = grid_array, temperature = self.temperature_array)
-                #--
-                thermal_demand_for_calculation = heating_related_demand #+ heat_production
-                electric_demand_for_calculation = electric_related_demand
-                electric_demand = electric_related_demand + power_production
-                spaceheating_demand = heating_related_demand
-                dhw_demand = heat_production
-            else:
-                spaceheating_series = self.PROFET_DATA[f"{row[self.PROFET_BUILDINGTYPE]}_{row[self.PROFET_BUILDINGSTANDARD]}_SPACEHEATING"]
-                spaceheating_demand = row[self.BUILDING_AREA] * np.array(spaceheating_series)
-                dhw_demand_series = self.PROFET_DATA[f"{row[self.PROFET_BUILDINGTYPE]}_{row[self.PROFET_BUILDINGSTANDARD]}_DHW"]
-                dhw_demand = row[self.BUILDING_AREA] * np.array(dhw_demand_series)
-                electric_demand_series = self.PROFET_DATA[f"{row[self.PROFET_BUILDINGTYPE]}_{row[self.PROFET_BUILDINGSTANDARD]}_ELECTRIC"]
-                electric_demand = row[self.BUILDING_AREA] * np.array(electric_demand_series)
-                #--
-                thermal_demand_for_calculation = dhw_demand + spaceheating_demand
-                electric_demand_for_calculation = electric_demand
+            spaceheating_series = self.PROFET_DATA[f"{row[self.PROFET_BUILDINGTYPE]}_{row[self.PROFET_BUILDINGSTANDARD]}_SPACEHEATING"]
+            spaceheating_demand = row[self.BUILDING_AREA] * np.array(spaceheating_series)
+            dhw_demand_series = self.PROFET_DATA[f"{row[self.PROFET_BUILDINGTYPE]}_{row[self.PROFET_BUILDINGSTANDARD]}_DHW"]
+            dhw_demand = row[self.BUILDING_AREA] * np.array(dhw_demand_series)
+            electric_demand_series = self.PROFET_DATA[f"{row[self.PROFET_BUILDINGTYPE]}_{row[self.PROFET_BUILDINGSTANDARD]}_ELECTRIC"]
+            electric_demand = row[self.BUILDING_AREA] * np.array(electric_demand_series)
+            #--
+            thermal_demand_for_calculation = dhw_demand + spaceheating_demand
+            electric_demand_for_calculation = electric_demand
             #--
             thermal_demand_for_calculation = thermal_demand_for_calculation - (thermal_demand_for_calculation/100)*row[self.REDUCE_THERMAL_DEMAND]
             electric_demand_for_calculation = electric_demand_for_calculation - (electric_demand_for_calculation/100)*row[self.REDUCE_ELECTRIC_DEMAND]
@@ -538,17 +500,13 @@ class EnergyAnalysis:
             #logger.info("Solcelleberegning feilet")
         return -solceller
     
-    def grunnvarme_meter_and_cost_calculation(self, row):
-        well_meter, gshp_cost = 0, 0
-        try:
-            if row[self.GSHP] == True:
-                cost_per_well_meter = 600
-                well_meter = round(np.sum(abs(row[self.FROM_SOURCE])) / 80,0)
-                gshp_cost = round(well_meter * cost_per_well_meter,0)
-        except Exception:
-            pass
-            #logger.info("Kostnadsberegning grunnvarme feilet")
-        return well_meter, gshp_cost
+    def grunnvarme_meter_and_cost_calculation(self, df):
+        # brønnpark dimensjonert for alle bygg med grunnvarme samlet, se boreholesizing.py
+        well_meter, boreholes, gshp_cost = np.zeros(len(df)), np.zeros(len(df), dtype = int), np.zeros(len(df))
+        gshp = (df[self.GSHP] == True).to_numpy()
+        if np.any(gshp):
+            well_meter[gshp], boreholes[gshp], gshp_cost[gshp] = size_boreholes(self.series_matrix(df.loc[gshp], self.FROM_SOURCE))
+        return well_meter, boreholes, gshp_cost
         
     def compile_data(self, row):
         if (len(row[self.THERMAL_DEMAND_FOR_CALCULATION]) == 1) or (len(row[self.ELECTRIC_DEMAND_FOR_CALCULATION]) == 1):
@@ -558,10 +516,19 @@ class EnergyAnalysis:
             electric_balance = row[self.ELECTRIC_DEMAND_FOR_CALCULATION] + row[self.COMPRESSOR] + row[self.PEAK] + row[self.SOLAR_PANELS_PRODUCED]
             total_balance = thermal_balance + electric_balance
             year_sum = round(np.sum(total_balance),-2)
-            winter_max = round((total_balance[self.WINTER_MAX]),0)
-            summer_max = round((total_balance[self.SUMMER_MAX]),0)
+            winter_max = round(np.max(total_balance[SEASON_MASKS["vinter"]]),0)
+            summer_max = round(np.max(total_balance[SEASON_MASKS["sommer"]]),0)
         return total_balance, self.__rounding_energy(year_sum), self.__rounding_effect(winter_max), self.__rounding_effect(summer_max)
     
+    def et_statistics(self, df):
+        grid_column = f'{self.GRID}_energi_liste'
+        matrix = self.series_matrix(df, grid_column)
+        for band in TEMPERATURE_BANDS:
+            sum_y, sum_xy = load_statistics(matrix, self.temperature_array, band)
+            column_y, column_xy = column_names(grid_column, band)
+            df[column_y], df[column_xy] = sum_y, sum_xy
+        return df
+    
     def sumify(self, row):
         thermal_demand = self.__rounding_energy(np.sum(row[self.THERMAL_DEMAND_FOR_CALCULATION]))
         from_source = self.__rounding_energy(np.sum(row[self.FROM_SOURCE]))
@@ -572,71 +539,162 @@ class EnergyAnalysis:
         solar_panels_produced = self.__rounding_energy(np.sum(row[self.SOLAR_PANELS_PRODUCED]))
         return abs(thermal_demand), abs(from_source), abs(district_heating_produced), abs(electric_demand), abs(compressor), abs(peak), abs(solar_panels_produced)
     
-    def maxify_winter(self, row):
-        max_index = self.WINTER_MAX
-        try:
-            thermal_demand = self.__rounding_effect((row[self.THERMAL_DEMAND_FOR_CALCULATION])[max_index])
-        except Exception:
-            thermal_demand = 0
-        try:
-            from_source = self.__rounding_effect((row[self.FROM_SOURCE])[max_index])
-        except Exception:
-            from_source = 0
-        try:
-            district_heating_produced = self.__rounding_effect((row[self.DISTRICT_HEATING_PRODUCED])[max_index])
-        except Exception:
-            district_heating_produced = 0
+    def __season_max(self, array, season):
         try:
-            electric_demand = self.__rounding_effect((row[self.ELECTRIC_DEMAND_FOR_CALCULATION])[max_index])
+            return self.__rounding_effect(np.max(np.abs(array[SEASON_MASKS[season]])))
         except Exception:
-            electric_demand = 0
-        try:
-            compressor = self.__rounding_effect((row[self.COMPRESSOR])[max_index])
-        except Exception:
-            compressor = 0
-        try:
-            peak = self.__rounding_effect((row[self.PEAK])[max_index])
-        except Exception:
-            peak = 0
-        try:
-            solar_panels_produced = self.__rounding_effect((row[self.SOLAR_PANELS_PRODUCED])[max_index])
-        except Exception:
-            solar_panels_produced = 0
-        return abs(thermal_demand), abs(from_source), abs(district_heating_produced), abs(electric_demand), abs(compressor), abs(peak), abs(solar_panels_produced)     
+            return 0
+    
+    def __maxify_season(self, row, season):
+        columns = [self.THERMAL_DEMAND_FOR_CALCULATION, self.FROM_SOURCE, self.DISTRICT_HEATING_PRODUCED, self.ELECTRIC_DEMAND_FOR_CALCULATION, self.COMPRESSOR, self.PEAK, self.SOLAR_PANELS_PRODUCED]
+        return tuple(self.__season_max(row[column], season) for column in columns)
+    
+    def maxify_winter(self, row):
+        return self.__maxify_season(row, "vinter")
     
     def maxify_summer(self, row):
-        max_index = self.SUMMER_MAX
-        try:
-            thermal_demand = self.__rounding_effect((row[self.THERMAL_DEMAND_FOR_CALCULATION])[max_index])
-        except Exception:
-            thermal_demand = 0
-        try:
-            from_source = self.__rounding_effect((row[self.FROM_SOURCE])[max_index])
-        except Exception:
-            from_source = 0
-        try:
-            district_heating_produced = self.__rounding_effect((row[self.DISTRICT_HEATING_PRODUCED])[max_index])
-        except Exception:
-            district_heating_produced = 0
-        try:
-            electric_demand = self.__rounding_effect((row[self.ELECTRIC_DEMAND_FOR_CALCULATION])[max_index])
-        except Exception:
-            electric_demand = 0
-        try:
-            compressor = self.__rounding_effect((row[self.COMPRESSOR])[max_index])
-        except Exception:
-            compressor = 0
-        try:
-            peak = self.__rounding_effect((row[self.PEAK])[max_index])
-        except Exception:
-            peak = 0
-        try:
-            solar_panels_produced = self.__rounding_effect((row[self.SOLAR_PANELS_PRODUCED])[max_index])
-        except Exception:
-            solar_panels_produced = 0
-        return abs(thermal_demand), abs(from_source), abs(district_heating_produced), abs(electric_demand), abs(compressor), abs(peak), abs(solar_panels_produced) 
+        return self.__maxify_season(row, "sommer")
+    
+    def hourly_data_fields(self):
+        return [f'{self.GRID}_energi_liste', self.DHW_DEMAND, self.SPACEHEATING_DEMAND, self.ELECTRIC_DEMAND_FOR_CALCULATION, self.ELECTRIC_DEMAND, self.THERMAL_DEMAND_FOR_CALCULATION]
+    
+    def series_matrix(self, df, column):
+        return np.array([np.ravel(array) if len(np.atleast_1d(array)) == 8760 else np.zeros(8760) for array in df[column]]).reshape(-1, 8760)
+    
+    def basis_profiles(self):
+        profiles = {column : self.PROFET_DATA[column].to_numpy() for column in self.PROFET_DATA.columns if column.endswith(("_DHW", "_SPACEHEATING", "_ELECTRIC"))}
+        for column in self.SOLARPANEL_DATA.columns:
+            profiles[f"SOL_{column}"] = self.SOLARPANEL_DATA[column].to_numpy()
+        return profiles
+    
+    def basis_candidates(self, row):
+        profile = f"{row[self.PROFET_BUILDINGTYPE]}_{row[self.PROFET_BUILDINGSTANDARD]}"
+        return [f"{profile}_DHW", f"{profile}_SPACEHEATING", f"{profile}_ELECTRIC", f"SOL_{self.SOLARPANEL_BUILDINGS[row[self.PROFET_BUILDINGTYPE]]}"]
+    
+    def parameter_sweep(self, df, grid):
+        # følsomhetsanalyse over et simulert scenario: grid fra batchsimulation.parameter_grid, én rad per kombinasjon
+        matrices = {column : self.series_matrix(df, column) for column in [self.THERMAL_DEMAND_FOR_CALCULATION, self.ELECTRIC_DEMAND_FOR_CALCULATION, self.DISTRICT_HEATING_PRODUCED, self.SOLAR_PANELS_PRODUCED]}
+        base = sum(matrices.values())
+        gshp = (df[self.GSHP] == True).to_numpy()
+        ashp = (df[self.ASHP] == True).to_numpy() & ~gshp
+        return parameter_sweep(base = base, thermal = matrices[self.THERMAL_DEMAND_FOR_CALCULATION], gshp = gshp, ashp = ashp, temperature = self.temperature_array, grid = grid)
+    
+    def peak_statistics(self, df, matrices, scenario_name):
+        # ekte (samtidige og ikke-samtidige) effekttopper per bygg, energiområde og hele området
+        df_peaks, coincident = peak_analysis(
+            matrices = matrices, 
+            object_ids = df[self.OBJECT_ID].to_numpy(), 
+            groupings = {self.ENERGY_AREA_ID : df[self.ENERGY_AREA_ID].to_numpy()}
+            )
+        df_peaks.to_csv(f"{self.OUTPUT_FOLDER}/{scenario_name}_effekttopper.csv")
+        for level in [self.ENERGY_AREA_ID, WHOLE_AREA]:
+            for season in ["vinter", "sommer"]:
+                df[f'{self.GRID}_samtidig_{level}_{season}effekt'] = coincident[(f'{self.GRID}_energi_liste', level, season)]
+        return df
+    
+    def storage_statistics(self, df, matrices, scenario_name):
+        # batteri/varmelager per bygg og som felles lager per energiområde, nettutvekslingen erstattes av byggenes resultat
+        if self.STORAGE is None:
+            return df
+        storage_type, policy = self.STORAGE["type"], self.STORAGE["styring"]
+        grid_column = f'{self.GRID}_energi_liste'
+        before = matrices[grid_column]
+        capacity, power, efficiency, loss = storage_parameters(storage_type, df[self.PROFET_BUILDINGTYPE], df[self.BUILDING_AREA])
+        discharge_limit = None
+        if storage_type == "varmtvann":
+            # varmelageret kan bare erstatte strømmen byggets varme faktisk tar fra nettet: hele varmebehovet ved direkte
+            # elektrisk oppvarming, bare kompressor og spisslast (behov / COP) med varmepumpe, ingenting med fjernvarme
+            district_heating = (df[self.DISTRICT_HEATING] == True).to_numpy()
+            electric_heating = matrices[self.THERMAL_DEMAND_FOR_CALCULATION] + self.series_matrix(df, self.FROM_SOURCE) + self.series_matrix(df, self.DISTRICT_HEATING_PRODUCED)
+            discharge_limit = np.where(district_heating[:, None], 0, np.maximum(electric_heating, 0))
+            capacity = np.where(district_heating, 0, capacity)
+        after, exchange, state = run_storage(before, capacity, power, efficiency, loss, policy, discharge_limit, SEASON_MASKS["aar"])
+        df_summary = storage_summary(df[self.OBJECT_ID].to_numpy(), before, after, exchange)
+        df_summary.insert(0, "nivaa", "bygg")
+        groups, inverse, membership = membership_matrix(df[self.ENERGY_AREA_ID].to_numpy())
+        group_before = aggregate(membership, {grid_column : before})[grid_column]
+        group_limit = None if discharge_limit is None else aggregate(membership, {grid_column : discharge_limit})[grid_column]
+        group_after, group_exchange, group_state = run_storage(group_before, membership @ capacity, membership @ power, np.mean(efficiency), np.mean(loss), policy, group_limit, SEASON_MASKS["aar"])
+        df_groups = storage_summary(groups, group_before, group_after, group_exchange)
+        df_groups.insert(0, "nivaa", self.ENERGY_AREA_ID)
+        pd.concat([df_summary, df_groups], ignore_index = True).to_csv(f"{self.OUTPUT_FOLDER}/{scenario_name}_lager.csv")
+        matrices[grid_column] = after
+        df[grid_column] = list(after)
+        df[f'{self.GRID}_energi'] = np.round(np.sum(after, axis = 1), -2)
+        df[f'{self.GRID}_vintereffekt'] = np.round(np.max(after[:, SEASON_MASKS["vinter"]], axis = 1), 0)
+        df[f'{self.GRID}_sommereffekt'] = np.round(np.max(after[:, SEASON_MASKS["sommer"]], axis = 1), 0)
+        df["_lager_kapasitet"] = capacity
+        return self.et_statistics(df) # ET-kurven skal vise nettutvekslingen med lager, som energi- og effektkolonnene
+    
+    def weather_statistics(self, df, matrices, scenario_name, chunk_size = 500):
+        # samme bygningsmasse og tiltak evaluert for alle værår, med året som første dimensjon
+        if len(self.weather_years) == 0:
+            return df
+        year_names = list(self.weather_years.keys())
+        temperatures = np.array(list(self.weather_years.values()))
+        thermal_matrix = matrices[self.THERMAL_DEMAND_FOR_CALCULATION]
+        electric_matrix = matrices[self.ELECTRIC_DEMAND_FOR_CALCULATION]
+        solar_matrix = self.series_matrix(df, self.SOLAR_PANELS_PRODUCED)
+        profet = (~df[self.HAS_EXISTING_DATA].astype(bool)).to_numpy() & thermal_matrix.any(axis = 1)
+        profile_keys, profile_index = np.unique((df[self.PROFET_BUILDINGTYPE] + "_" + df[self.PROFET_BUILDINGSTANDARD]).to_numpy(dtype = str), return_inverse = True)
+        profiles = profile_stack(self.weather_profiles, profile_keys)
+        area = df[self.BUILDING_AREA].to_numpy(dtype = float)
+        thermal_share = 1 - df[self.REDUCE_THERMAL_DEMAND].to_numpy(dtype = float) / 100
+        electric_share = 1 - df[self.REDUCE_ELECTRIC_DEMAND].to_numpy(dtype = float) / 100
+        district_heating = (df[self.DISTRICT_HEATING] == True).to_numpy()
+        gshp = (df[self.GSHP] == True).to_numpy()
+        ashp = (df[self.ASHP] == True).to_numpy() & ~gshp
+        gshp_coverage = df[self.PROFET_BUILDINGTYPE].map(self.DEKNINGSGRADER_GSHP).fillna(100).to_numpy(dtype = float)
+        gshp_cop = df[self.PROFET_BUILDINGTYPE].map(self.COEFFICIENT_OF_PERFORMANCES_GSHP).fillna(1).to_numpy(dtype = float)
+        totals = np.zeros((len(year_names), 8760))
+        building_peaks = np.zeros((len(year_names), len(df)))
+        for rows in np.array_split(np.arange(len(df)), max(1, len(df) // chunk_size)):
+            thermal = np.broadcast_to(thermal_matrix[rows], (len(year_names), len(rows), 8760)).copy()
+            electric = np.broadcast_to(electric_matrix[rows], thermal.shape).copy()
+            profet_rows = rows[profet[rows]]
+            position = np.flatnonzero(profet[rows])
+            weight = area[profet_rows][None, :, None]
+            thermal[:, position] = weight * (profiles["DHW"][:, profile_index[profet_rows]] + profiles["SPACEHEATING"][:, profile_index[profet_rows]]) * thermal_share[profet_rows][None, :, None]
+            electric[:, position] = weight * profiles["ELECTRIC"][:, profile_index[profet_rows]] * electric_share[profet_rows][None, :, None]
+            balance = heat_pump_balance(thermal, temperatures, gshp[rows], ashp[rows], gshp_coverage[rows], gshp_cop[rows])
+            # fjernvarme dekker hele det termiske behovet, som i fjernvarme_calculation
+            grid = np.where(district_heating[rows][None, :, None], 0, thermal) + balance + electric + solar_matrix[rows][None]
+            totals += grid.sum(axis = 1)
+            building_peaks[:, rows] = np.max(grid, axis = 2)
+        ensemble_report(year_names, totals).to_csv(f"{self.OUTPUT_FOLDER}/{scenario_name}_vaeraar.csv")
+        df[f'{self.GRID}_dimensjonerende_effekt'] = np.max(building_peaks, axis = 0)
+        df[f'{self.GRID}_dimensjonerende_vaeraar'] = np.array(year_names)[np.argmax(building_peaks, axis = 0)]
+        return df
     
-    def run_simulation(self, df, scenario_name, chunk_size = 1000, test = True):
+    def rollup_statistics(self, df, matrices, scenario_name):
+        df_cube = rollup_cube(
+            df = df, 
+            matrices = matrices, 
+            keys = [self.ENERGY_AREA_ID, self.BUILDING_AREA_ID, self.PROFET_BUILDINGTYPE], 
+            measure_columns = [self.GSHP, self.SOLAR_PANELS, self.ASHP, self.DISTRICT_HEATING, self.BUILDING_STANDARD_UPGRADED], 
+            area_column = self.BUILDING_AREA,
+            scenario_name = scenario_name
+            )
+        df_cube.to_csv(f"{self.OUTPUT_FOLDER}/{scenario_name}_kube.csv")
+    
+    def aggregation_statistics(self, df, matrices, scenario_name):
+        # aggregerte timeserier per energiområde, bygningsområde og egendefinerte grupperinger
+        matrices = dict(matrices)
+        matrices[self.DISTRICT_HEATING_PRODUCED] = -self.series_matrix(df, self.DISTRICT_HEATING_PRODUCED)
+        object_ids = df[self.OBJECT_ID].to_numpy()
+        groupings = user_groupings(object_ids)
+        for grouping in [self.ENERGY_AREA_ID, self.BUILDING_AREA_ID]:
+            groups, inverse, membership = membership_matrix(df[grouping].to_numpy())
+            groupings[grouping] = (groups, membership)
+        df_summary_list = []
+        for grouping, (groups, membership) in groupings.items():
+            aggregated, df_summary = group_summary(grouping, groups, membership, matrices)
+            to_timedata(groups, aggregated).to_csv(f"{self.OUTPUT_FOLDER}/{scenario_name}_aggregert_{grouping}.csv")
+            df_summary_list.append(df_summary)
+        pd.concat(df_summary_list, ignore_index = True).to_csv(f"{self.OUTPUT_FOLDER}/{scenario_name}_grupper.csv")
+        return list(groupings.keys())
+    
+    def run_simulation(self, df, scenario_name, chunk_size = 1000, test = True, spec_hash = None):
         def __chunkify(df, chunk_size):
             list_df = [df[i:i+chunk_size] for i in range(0,df.shape[0],chunk_size)]
             return list_df
@@ -646,31 +704,28 @@ class EnergyAnalysis:
             df_results = df_results.sort_values(self.OBJECT_ID).reset_index(drop=True)
             return df_results
         
-        def __export_hourly_data(df):
-            hourly_data_fiels = [f'{self.GRID}_energi_liste', self.DHW_DEMAND, self.SPACEHEATING_DEMAND, self.ELECTRIC_DEMAND_FOR_CALCULATION, self.ELECTRIC_DEMAND, self.THERMAL_DEMAND_FOR_CALCULATION]
-            new_df = pd.DataFrame()
-            for datafield in hourly_data_fiels:
-                old_df = pd.DataFrame()
-                for count, row in df.iterrows():
-                    object_id = row[self.OBJECT_ID]
-                    array = np.zeros(8760)
-                    try:
-                        array = row[datafield].flatten()
-                    except Exception:
-                        pass
-                    old_df[f"{object_id}"] = array
-                old_df["ID"] = datafield
-                new_df = pd.concat([old_df, new_df]).reset_index(drop=True)
-            new_df["scenario"] = scenario_name
-            new_df.to_csv(f"output/{scenario_name}_timedata.csv")
+        def __export_hourly_data(df, matrices):
+            object_ids = df[self.OBJECT_ID].to_numpy()
+            if self.COMPRESS_HOURLY_DATA:
+                basis_names, basis = basis_matrix(self.basis_profiles())
+                candidate_basis = [self.basis_candidates(row) for index, row in df.iterrows()]
+                df_coefficients, df_residuals = compress(matrices, object_ids, candidate_basis, basis_names, basis)
+                df_coefficients.to_csv(f"{self.OUTPUT_FOLDER}/{scenario_name}_komprimert.csv")
+                df_residuals.to_csv(f"{self.OUTPUT_FOLDER}/{scenario_name}_residualer.csv")
+                pd.DataFrame(basis.T, columns = basis_names).to_csv(f"{self.OUTPUT_FOLDER}/{scenario_name}{BASIS_SUFFIX}")
+            else:
+                new_df = pd.concat([to_timedata(object_ids, {datafield : matrices[datafield]}) for datafield in self.hourly_data_fields()], ignore_index = True)
+                new_df["scenario"] = scenario_name
+                new_df.to_csv(f"{self.OUTPUT_FOLDER}/{scenario_name}_timedata.csv")
         
-        def __clean_dataframe_and_export_to_csv(df, scenario_name):
-            __export_hourly_data(df = df)
+        def __clean_dataframe_and_export_to_csv(df, matrices, scenario_name):
+            __export_hourly_data(df = df, matrices = matrices)
             df["scenario"] = scenario_name
-            df.to_csv(f"output/{scenario_name}_unfiltered.csv")
+            df.to_csv(f"{self.OUTPUT_FOLDER}/{scenario_name}_unfiltered.csv")
+            write_manifest_entry(folder_path = self.OUTPUT_FOLDER, scenario_name = scenario_name, groupings = self.groupings, compressed = self.COMPRESS_HOURLY_DATA, spec_hash = spec_hash, weather = len(self.weather_years) > 0)
             #df.drop([self.THERMAL_DEMAND, self.ELECTRIC_DEMAND, self.COMPRESSOR, self.FROM_SOURCE, self.PEAK, self.DISTRICT_HEATING_PRODUCED, self.SOLAR_PANELS_PRODUCED, f'_nettutveksling_energi_liste'], axis=1, inplace=True)
             df[self.SCENARIO_NAME] = scenario_name
-            #df.to_csv(f"output/{scenario_name}_filtered.csv")
+            #df.to_csv(f"{self.OUTPUT_FOLDER}/{scenario_name}_filtered.csv")
             return df
 
         df_chunked_list = []
@@ -682,9 +737,10 @@ class EnergyAnalysis:
             df_chunked[self.DISTRICT_HEATING_PRODUCED] = df_chunked.apply(self.fjernvarme_calculation, axis=1)
             df_chunked[self.SOLAR_PANELS_PRODUCED] = df_chunked.apply(self.solcelle_calculation, axis=1)
             # costs
-            df_chunked[f"{self.GSHP}_meter"], df_chunked[f"{self.GSHP}_kostnad"] = zip(*df_chunked.apply(self.grunnvarme_meter_and_cost_calculation, axis=1))
+            df_chunked[f"{self.GSHP}_meter"], df_chunked[f"{self.GSHP}_broenner"], df_chunked[f"{self.GSHP}_kostnad"] = self.grunnvarme_meter_and_cost_calculation(df_chunked)
             # conclusion
             df_chunked[f'{self.GRID}_energi_liste'], df_chunked[f'{self.GRID}_energi'], df_chunked[f'{self.GRID}_vintereffekt'], df_chunked[f'{self.GRID}_sommereffekt'] = zip(*df_chunked.apply(self.compile_data, axis=1))
+            df_chunked = self.et_statistics(df_chunked)
             df_chunked[f'{self.THERMAL_DEMAND_FOR_CALCULATION}_sum'], df_chunked[f'{self.FROM_SOURCE}_sum'], df_chunked[f'{self.DISTRICT_HEATING_PRODUCED}_sum'], df_chunked[f'{self.ELECTRIC_DEMAND_FOR_CALCULATION}_sum'], df_chunked[f'{self.COMPRESSOR}_sum'], df_chunked[f'{self.PEAK}_sum'], df_chunked[f'{self.SOLAR_PANELS_PRODUCED}_sum']  = zip(*df_chunked.apply(self.sumify, axis=1))   
             df_chunked[f'{self.THERMAL_DEMAND_FOR_CALCULATION}_vintereffekt'], df_chunked[f'{self.FROM_SOURCE}_vintereffekt'], df_chunked[f'{self.DISTRICT_HEATING_PRODUCED}_vintereffekt'], df_chunked[f'{self.ELECTRIC_DEMAND_FOR_CALCULATION}_vintereffekt'], df_chunked[f'{self.COMPRESSOR}_vintereffekt'], df_chunked[f'{self.PEAK}_vintereffekt'], df_chunked[f'{self.SOLAR_PANELS_PRODUCED}_vintereffekt']  = zip(*df_chunked.apply(self.maxify_winter, axis=1))   
             df_chunked[f'{self.THERMAL_DEMAND_FOR_CALCULATION}_sommereffekt'], df_chunked[f'{self.FROM_SOURCE}_sommereffekt'], df_chunked[f'{self.DISTRICT_HEATING_PRODUCED}_sommereffekt'], df_chunked[f'{self.ELECTRIC_DEMAND_FOR_CALCULATION}_sommereffekt'], df_chunked[f'{self.COMPRESSOR}_sommereffekt'], df_chunked[f'{self.PEAK}_sommereffekt'], df_chunked[f'{self.SOLAR_PANELS_PRODUCED}_sommereffekt']  = zip(*df_chunked.apply(self.maxify_summer, axis=1))   
@@ -693,10 +749,64 @@ class EnergyAnalysis:
             if index == 2 and test == True:
                 break 
         df = __merge_dataframe_list(df_chunked_list)
+        matrices = {column : self.series_matrix(df, column) for column in self.hourly_data_fields()}
+        df = self.storage_statistics(df, matrices, scenario_name)
+        df = self.peak_statistics(df, matrices, scenario_name)
+        df = self.weather_statistics(df, matrices, scenario_name)
+        self.rollup_statistics(df, matrices, scenario_name)
+        self.groupings = self.aggregation_statistics(df, matrices, scenario_name)
         # df logikk for å summere alt
-        df = __clean_dataframe_and_export_to_csv(df, scenario_name)
+        df = __clean_dataframe_and_export_to_csv(df, matrices, scenario_name)
         return df
     
+    def marginal_effects(self, df):
+        # endring i hvert byggs nettutveksling (bygg x 8760) og kostnad hvis tiltaket innføres alene, for alle bygg samlet
+        thermal = self.series_matrix(df, self.THERMAL_DEMAND_FOR_CALCULATION)
+        coverage = df[self.PROFET_BUILDINGTYPE].map(self.DEKNINGSGRADER_GSHP).fillna(100).to_numpy(dtype = float)
+        cop = df[self.PROFET_BUILDINGTYPE].map(self.COEFFICIENT_OF_PERFORMANCES_GSHP).fillna(1).to_numpy(dtype = float)[:, None]
+        deltas, costs = {}, {}
+        gshp_supply = coverage_cap(thermal, coverage)
+        deltas[self.GSHP] = gshp_supply / cop - gshp_supply
+        costs[self.GSHP] = size_boreholes(gshp_supply - gshp_supply / cop)[2] + measure_cost(self.GSHP, np.max(gshp_supply, axis = 1), 0)
+        p_nominal = np.minimum(np.max(thermal, axis = 1) * SWEEP_DEFAULTS["effektdekning_luft"] / 100, SWEEP_DEFAULTS["maks_effekt_luft"])
+        ashp_delivered, ashp_cop = ashp_supply(thermal, self.temperature_array, p_nominal, ashp_tables(self.temperature_array))
+        deltas[self.ASHP] = ashp_delivered / (ashp_cop * SWEEP_DEFAULTS["cop_nominell_luft"]) - ashp_delivered
+        costs[self.ASHP] = measure_cost(self.ASHP, p_nominal, 0)
+        deltas[self.DISTRICT_HEATING] = -thermal
+        costs[self.DISTRICT_HEATING] = measure_cost(self.DISTRICT_HEATING, np.max(thermal, axis = 1), 0)
+        solar_rows = [self.solcelle_calculation(row) for index, row in df.assign(**{self.SOLAR_PANELS : True}).iterrows()]
+        solar = np.array([np.ravel(value) if np.size(value) == 8760 else np.zeros(8760) for value in solar_rows]).reshape(-1, 8760)
+        deltas[self.SOLAR_PANELS] = solar
+        costs[self.SOLAR_PANELS] = measure_cost(self.SOLAR_PANELS, 0, -np.sum(solar, axis = 1))
+        # bygg som allerede har tiltaket (eller annen oppvarming) er ikke kandidater
+        for measure in deltas:
+            taken = (df[self.HEATING_EXISTS] == True) if measure in HEATING_MEASURES else (df[measure] == True)
+            deltas[measure][taken.to_numpy()] = 0
+        return deltas, costs
+    
+    def measure_delta_statistics(self, df, scenario_name):
+        # endring i nettutveksling per bygg og tiltak, brukes av tiltakskomponisten i dashbordet
+        deltas, costs = self.marginal_effects(df)
+        district_heating = (df[self.DISTRICT_HEATING] == True).to_numpy()[:, None]
+        deltas[self.REDUCE_THERMAL_DEMAND] = np.where(district_heating, 0, -self.series_matrix(df, self.THERMAL_DEMAND_FOR_CALCULATION) / 100)
+        deltas[self.REDUCE_ELECTRIC_DEMAND] = -self.series_matrix(df, self.ELECTRIC_DEMAND_FOR_CALCULATION) / 100
+        write_measure_deltas(folder_path = self.OUTPUT_FOLDER, scenario_name = scenario_name, object_ids = df[self.OBJECT_ID].to_numpy(), deltas = deltas)
+    
+    def optimize_portfolio(self, df, target, reduction, scenario_name):
+        # grådig valg av tiltak på bygg fra et simulert scenario, simuleres og eksporteres som et vanlig scenario
+        deltas, costs = self.marginal_effects(df)
+        total = np.sum(self.series_matrix(df, f'{self.GRID}_energi_liste'), axis = 0)
+        df_chosen, start, result = greedy_portfolio(total = total, deltas = deltas, costs = costs, target = target, reduction = reduction, mask = SEASON_MASKS["vinter"])
+        df = df.reset_index(drop = True).copy()
+        for measure, df_measure in df_chosen.groupby("tiltak"):
+            rows = df_measure["bygg"].to_numpy()
+            df.loc[rows, measure] = True
+            if measure in HEATING_MEASURES:
+                df.loc[rows, self.HEATING_EXISTS] = True
+        df_chosen[self.OBJECT_ID] = df.loc[df_chosen["bygg"], self.OBJECT_ID].to_numpy()
+        df_chosen.assign(maal = target, startverdi = start, resultat = result).to_csv(f"{self.OUTPUT_FOLDER}/{scenario_name}_tiltak.csv")
+        return self.run_simulation(df = df, scenario_name = scenario_name)
+    
     def add_random_values(self, df, energy_id, building_type, percentage, column):
         fill_value = True
         if (column == self.GSHP) or (column == self.ASHP) or (column == self.DISTRICT_HEATING):
@@ -707,7 +817,7 @@ class EnergyAnalysis:
             selected_df = df[(df[self.ENERGY_AREA_ID] == energy_id) & (df[self.PROFET_BUILDINGTYPE] == building_type)]
         number_of_rows = len(selected_df)
         n_values = int((percentage / 100) * number_of_rows)
-        random_indices = random.sample(range(number_of_rows), n_values)
+        random_indices = self.rng.sample(range(number_of_rows), n_values)
         random_values = [fill_value for _ in range(n_values)]
         selected_df = selected_df.sort_values(self.OBJECT_ID).reset_index(drop=True)
         selected_df.loc[random_indices, column] = random_values
@@ -723,80 +833,83 @@ class EnergyAnalysis:
         df = pd.concat([selected_df, unselected_df], ignore_index = True)
         return df
     
-    def create_scenario(self, df, energy_dicts):
-        PERCENTAGE_CODE_MAP = {
-            "G" : self.GSHP,
-            "S" : self.SOLAR_PANELS,
-            "V" : self.ASHP,
-            "F" : self.DISTRICT_HEATING,
-            "O" : self.BUILDING_STANDARD_UPGRADED,
-            "T" : self.REDUCE_THERMAL_DEMAND,
-            "E" : self.REDUCE_ELECTRIC_DEMAND
-        }
+    def create_scenario(self, df, shares, seed = None):
+        # seedet med scenariohashen: samme spesifikasjon og inndata gir samme utvalg av bygg ved hver kjøring,
+        # slik at scenarier som ikke simuleres på nytt fortsatt bygger på referansen som ligger i output
+        self.rng = random.Random(seed)
         for supply_technology in [self.GSHP, self.SOLAR_PANELS, self.ASHP, self.DISTRICT_HEATING, self.BUILDING_STANDARD_UPGRADED, self.HEATING_EXISTS]:
             df[supply_technology] = False
             
         df[self.REDUCE_THERMAL_DEMAND] = 0
         df[self.REDUCE_ELECTRIC_DEMAND] = 0
         #--
-        unique_energy_ids = df[self.ENERGY_AREA_ID].unique()
-        for i in range(0, len(unique_energy_ids)): # energiområdeid
-            energy_id = unique_energy_ids[i]
-            #df_energy_id = df[df[self.ENERGY_AREA_ID] == energy_id]
-            percentage_codes = energy_dicts[energy_id]
-            building_types = list(percentage_codes.keys())
-            for j in range(0, len(percentage_codes)): # bygningstype i energiområde
-                building_type = building_types[j]
-                percentage_code = percentage_codes[building_type]
-                #st.write(energy_id, building_type, percentage_code)
-                individual_percentage_codes = percentage_code.split("_")
-                #st.write(individual_percentage_codes)
-                for k in range(0, len(individual_percentage_codes)):
-                    individual_percentage_code = individual_percentage_codes[k]
-                    tiltak = PERCENTAGE_CODE_MAP[individual_percentage_code[0]]
-                    tiltak_percentage = self.__string_percentage(individual_percentage_code)
-                    #st.write(tiltak, tiltak_percentage)
+        # andeler er ferdig validert i scenariospesifikasjonen: {energiområde: {bygningstype: {tiltak: prosent}}}
+        for energy_id in df[self.ENERGY_AREA_ID].unique(): # energiområdeid
+            for building_type, measures in shares.get(str(energy_id), {}).items(): # bygningstype i energiområde
+                for tiltak, tiltak_percentage in measures.items():
                     df = self.add_random_values(df = df, energy_id = energy_id, building_type = building_type, percentage = tiltak_percentage, column = tiltak)
-                    #df = self.fill_reduction_values(df = df, energy_id = energy_id, building_type = building_type, percentage = tiltak_percentage, column = tiltak)
         #--
         df[self.HAS_EXISTING_DATA] = False
         for index, row in df.iterrows():
-            address = str(row[self.HAS_ADDRESS])
-            if address in self.address_keys:
+            # bygg med ugyldige måleserier (se maaledata_rapport.csv i output-mappen) beregnes med PROFET
+            if self.metered_data.has_valid(row[self.HAS_ADDRESS]):
                 df.at[index, self.HAS_EXISTING_DATA] = True
         return df
     
-    def __default_simulation(self, df, energy_dicts, scenario_name):
+    def __default_simulation(self, df, shares, scenario_name, spec_hash):
         start_time = time.time()
-        df = self.create_scenario(df = df, energy_dicts = energy_dicts)
-        df = self.run_simulation(df = df, scenario_name = scenario_name)
+        df = self.create_scenario(df = df, shares = shares, seed = spec_hash)
+        df = self.run_simulation(df = df, scenario_name = scenario_name, spec_hash = spec_hash)
         end_time = time.time()
         #logger.info(f"Simulering {scenario_name}: {round((end_time - start_time),0)} sekunder")
         #self.export_to_arcgis(df = df, gdb = gdb, scenario_name = scenario_name)   
         #logger.info(f"Eksportert til ArcGIS")
         return df
     
-    def __modified_simulation(self, df, energy_dicts, scenario_name):
+    def __modified_simulation(self, df, shares, scenario_name, spec_hash):
         start_time = time.time()
-        df = self.modify_scenario(df = df, energy_dicts = energy_dicts)
-        df = self.run_simulation(df = df, scenario_name = scenario_name)
+        df = self.modify_scenario(df = df, shares = shares, seed = spec_hash)
+        df = self.run_simulation(df = df, scenario_name = scenario_name, spec_hash = spec_hash)
         end_time = time.time()
         #logger.info(f"Simulering {scenario_name}: {round((end_time - start_time),0)} sekunder")
         #self.export_to_arcgis(df = df, gdb = gdb, scenario_name = scenario_name)  
         #logger.info(f"Eksportert til ArcGIS")
     
+    def pipeline_inputs(self):
+        # alt utenom andelene som påvirker resultatene; endres noe av dette, simuleres alle scenarier på nytt
+        return [
+            self.BUILDING_TABLE, source_signature(f"input/{self.BUILDING_TABLE}"),
+            self.TEMPERATURE_ARRAY_FILE_NAME, source_signature(self.TEMPERATURE_ARRAY_FILE_NAME),
+            self.SOLARPANEL_DATA_FILE, source_signature(self.SOLARPANEL_DATA_FILE),
+            data_hash(self.PROFET_DATA.select_dtypes("number").to_numpy()),
+            *[f"{filename}:{source_signature(filename)}" for filename in weather_files()],
+            json.dumps({"lager" : self.STORAGE, "komprimert" : self.COMPRESS_HOURLY_DATA}, sort_keys = True),
+        ]
+
     def run_simulations(self, df):
-        energy_dicts_of_dicts, scenario_names = self.__read_scenario_file_excel()
-        
-        df = self.__default_simulation(df = df, energy_dicts = energy_dicts_of_dicts[0], scenario_name = scenario_names[0])
+        scenarios = load_scenarios(self.SCENARIO_FILE_NAME, spec_file = f"{self.OUTPUT_FOLDER}/{os.path.basename(SPEC_FILE)}")
+        inputs = self.pipeline_inputs()
+        reference = scenarios[0]
+        df = self.__default_simulation(df = df, shares = reference["andeler"], scenario_name = reference["navn"], spec_hash = scenario_hash(reference, inputs = inputs))
         original_df = df.copy()
+        self.measure_delta_statistics(df = original_df, scenario_name = reference["navn"])
+        
+        for scenario in scenarios[1:]:
+            spec_hash = scenario_hash(scenario, reference = reference, inputs = inputs)
+            # uendrede scenarier (samme hash i manifestet) simuleres ikke på nytt
+            if manifest_hash(folder_path = self.OUTPUT_FOLDER, scenario_name = scenario["navn"]) == spec_hash:
+                continue
+            self.__modified_simulation(df = original_df, shares = scenario["andeler"], scenario_name = scenario["navn"], spec_hash = spec_hash)
         
-        for i in range(1, len(scenario_names)):
-            self.__modified_simulation(df = original_df, energy_dicts = energy_dicts_of_dicts[i], scenario_name = scenario_names[i])
+        for target in self.OPTIMIZATION_TARGETS:
+            self.optimize_portfolio(df = original_df, target = target["maal"], reduction = target["reduksjon"], scenario_name = target["navn"])
     
     def main(self):
+        os.makedirs(self.OUTPUT_FOLDER, exist_ok = True)
         df = self.import_xlsx() # en df for alle planforslag
         temperature_array = self.__load_temperature_array()
-        self.preprocess_profet_data(temperature_array = temperature_array) # preprocess profet data
+        self.PROFET_DATA = self.preprocess_profet_data(temperature_array = temperature_array) # preprocess profet data
         self.preprocess_luft_luft_varmepumpe(temperature_array = temperature_array) # preprocess ashp
+        self.weather_years = read_weather_years(weather_files()) # værår for ensemble, tomt hvis input/vaerdata mangler
+        self.weather_profiles = {year : self.profet_profiles(temperature) for year, temperature in self.weather_years.items()}
         self.run_simulations(df)
\ No newline at end of file
@@ -0,0 +1,34 @@
+import numpy as np
+
+# Temperaturbånd for ET-kurven: navn -> (nedre, øvre) utetemperatur
+TEMPERATURE_BANDS = {
+    "alle" : (-np.inf, np.inf),
+    "fyringssesong" : (-np.inf, 10),
+}
+
+def band_mask(temperature_array, band):
+    lower, upper = TEMPERATURE_BANDS[band]
+    temperature_array = np.asarray(temperature_array, dtype = float)
+    return (temperature_array >= lower) & (temperature_array < upper)
+
+def temperature_statistics(temperature_array, band):
+    x = np.asarray(temperature_array, dtype = float)[band_mask(temperature_array, band)]
+    return len(x), np.sum(x), np.sum(x * x)
+
+def load_statistics(matrix, temperature_array, band):
+    # matrix: (bygg x timer) eller (timer,) -> sum(y), sum(x*y) per bygg
+    mask = band_mask(temperature_array, band)
+    x = np.where(mask, np.asarray(temperature_array, dtype = float), 0)
+    matrix = np.nan_to_num(np.asarray(matrix, dtype = float))
+    return matrix @ mask.astype(float), matrix @ x
+
+def column_names(series_name, band):
+    return f"{series_name}_et_{band}_sum_y", f"{series_name}_et_{band}_sum_xy"
+
+def fit(n, sum_x, sum_xx, sum_y, sum_xy):
+    denominator = n * sum_xx - sum_x ** 2
+    if n == 0 or denominator == 0:
+        return 0, 0
+    slope = (n * sum_xy - sum_x * sum_y) / denominator
+    intercept = (sum_y - slope * sum_x) / n
+    return intercept, slope
@@ -0,0 +1,79 @@
+import os
+import numpy as np
+import pandas as pd
+from batchsimulation import coverage_cap
+
+METERED_COLUMNS = ["Varmeproduksjon", "Strømproduksjon", "Levert energi til bygg (strømmåler)"]
+HEAT_PRODUCTION, POWER_PRODUCTION, GRID_DELIVERED = 0, 1, 2
+CACHE_FILE = "output/maaledata.npz"
+REPORT_FILE = "output/maaledata_rapport.csv"
+MAX_GAP_HOURS = 24 # lengre hull enn dette gjør måleserien ugyldig
+
+def _longest_gap(missing):
+    longest, current = 0, 0
+    for value in missing:
+        current = current + 1 if value else 0
+        longest = max(longest, current)
+    return longest
+
+def validate_sheet(df):
+    # -> (8760 x 3) array med interpolerte hull, rapportrad
+    report = {"timer" : len(df), "manglende_kolonner" : ", ".join([column for column in METERED_COLUMNS if column not in df.columns])}
+    array = np.full((8760, len(METERED_COLUMNS)), np.nan)
+    for j, column in enumerate(METERED_COLUMNS):
+        if column in df.columns:
+            values = pd.to_numeric(df[column], errors = "coerce").to_numpy()[:8760]
+            array[:len(values), j] = values
+    missing = np.isnan(array).any(axis = 1)
+    report["manglende_timer"] = int(np.sum(missing))
+    report["lengste_hull"] = _longest_gap(missing)
+    report["gyldig"] = (report["manglende_kolonner"] == "") and (report["lengste_hull"] <= MAX_GAP_HOURS)
+    array = pd.DataFrame(array).interpolate(limit_direction = "both").fillna(0).to_numpy()
+    return array, report
+
+def split_heating_demand(grid_delivered):
+    # samme fordeling som før: elspesifikt = 50 % energidekning av målt last, resten er varmerelatert
+    electric_related = coverage_cap(grid_delivered, 50)
+    fallback = np.sum(grid_delivered - electric_related, axis = 1) < 100
+    electric_related[fallback] = grid_delivered[fallback] * 0.5
+    return grid_delivered - electric_related, electric_related
+
+class MeteredData:
+    def __init__(self, workbook_path, address_dict, address_keys, cache_file = CACHE_FILE, report_file = REPORT_FILE):
+        signature = f"{workbook_path}:{os.path.getmtime(workbook_path)}:{os.path.getsize(workbook_path)}"
+        if not self.__load_cache(cache_file, signature):
+            self.__ingest(address_dict, address_keys)
+            np.savez(cache_file, signature = signature, addresses = self.addresses, data = self.data, heating = self.heating, electric = self.electric, valid = self.valid)
+            self.report.to_csv(report_file)
+        self.index = {address : i for i, address in enumerate(self.addresses)}
+
+    def __load_cache(self, cache_file, signature):
+        if not os.path.exists(cache_file):
+            return False
+        with np.load(cache_file, allow_pickle = False) as cache:
+            if str(cache["signature"]) != signature:
+                return False
+            self.addresses = [str(address) for address in cache["addresses"]]
+            self.data, self.heating, self.electric, self.valid = cache["data"], cache["heating"], cache["electric"], cache["valid"]
+        return True
+
+    def __ingest(self, address_dict, address_keys):
+        arrays, reports = [], []
+        for address in address_keys:
+            array, report = validate_sheet(address_dict[address])
+            report["adresse"] = address
+            arrays.append(array)
+            reports.append(report)
+        self.addresses = [str(address) for address in address_keys]
+        self.data = np.array(arrays).reshape(len(arrays), 8760, len(METERED_COLUMNS))
+        self.heating, self.electric = split_heating_demand(self.data[:, :, GRID_DELIVERED])
+        self.report = pd.DataFrame(reports)
+        self.valid = self.report["gyldig"].to_numpy(dtype = bool) if len(reports) > 0 else np.zeros(0, dtype = bool)
+
+    def has_valid(self, address):
+        address = str(address)
+        return address in self.index and bool(self.valid[self.index[address]])
+
+    def demand(self, address):
+        i = self.index[str(address)]
+        return self.data[i, :, HEAT_PRODUCTION], self.data[i, :, POWER_PRODUCTION], self.heating[i], self.electric[i]
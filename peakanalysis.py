@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+from aggregation import membership_matrix
+
+HOURS_IN_MONTHS = [744, 672, 744, 720, 744, 720, 744, 744, 720, 744, 720, 744]
+MONTH_OF_HOUR = np.repeat(np.arange(12), HOURS_IN_MONTHS)
+SEASONS = {
+    "aar" : list(range(12)),
+    "vinter" : [0, 1, 2, 10, 11],
+    "sommer" : [3, 4, 5, 6, 7, 8, 9],
+}
+SEASON_MASKS = {season : np.isin(MONTH_OF_HOUR, months) for season, months in SEASONS.items()}
+WHOLE_AREA = "område"
+BUILDING = "bygg"
+
+def top_k(matrix, k, mask = None):
+    # (..., 8760) -> timeindekser og verdier for de k høyeste timene, sortert synkende
+    values = np.asarray(matrix, dtype = float)
+    if mask is not None:
+        values = np.where(mask, values, -np.inf)
+    k = min(k, values.shape[-1])
+    index = np.argpartition(-values, k - 1, axis = -1)[..., :k]
+    top_values = np.take_along_axis(values, index, axis = -1)
+    order = np.argsort(-top_values, axis = -1)
+    return np.take_along_axis(index, order, axis = -1), np.take_along_axis(top_values, order, axis = -1)
+
+def group_sum(matrix, labels):
+    groups, inverse, membership = membership_matrix(labels)
+    return groups, inverse, np.asarray(membership @ matrix)
+
+def _peak_rows(level, ids, series_name, season, index, values, non_coincident):
+    k = index.shape[1]
+    return pd.DataFrame({
+        "nivaa" : level,
+        "id" : np.repeat(np.asarray(ids).astype(str), k), # objectid og gruppenavn i samme kolonne, alltid tekst
+        "serie" : series_name,
+        "sesong" : season,
+        "rang" : np.tile(np.arange(1, k + 1), len(ids)),
+        "time" : index.ravel(),
+        "effekt" : values.ravel(),
+        "ikke_samtidig_effekt" : np.repeat(non_coincident, k),
+    })
+
+def peak_analysis(matrices, object_ids, groupings, k = 3):
+    # matrices: {serie: (bygg x 8760)}, groupings: {nivå: gruppe per bygg}
+    levels = dict(groupings)
+    levels[WHOLE_AREA] = np.full(len(object_ids), WHOLE_AREA)
+    frames, coincident = [], {}
+    for series_name, matrix in matrices.items():
+        matrix = np.nan_to_num(np.asarray(matrix, dtype = float))
+        for season, mask in SEASON_MASKS.items():
+            index, values = top_k(matrix, k, mask)
+            building_peaks = values[:, 0]
+            frames.append(_peak_rows(BUILDING, object_ids, series_name, season, index, values, building_peaks))
+            for level, labels in levels.items():
+                groups, inverse, aggregated = group_sum(matrix, labels)
+                group_index, group_values = top_k(aggregated, k, mask)
+                non_coincident = np.bincount(inverse, weights = building_peaks, minlength = len(groups))
+                frames.append(_peak_rows(level, groups, series_name, season, group_index, group_values, non_coincident))
+                # hvert byggs bidrag i gruppens (samtidige) topptime
+                coincident[(series_name, level, season)] = matrix[np.arange(len(object_ids)), group_index[inverse, 0]]
+    df = pd.concat(frames, ignore_index = True)
+    df["samtidighetsfaktor"] = np.where(df["ikke_samtidig_effekt"] > 0, df["effekt"] / df["ikke_samtidig_effekt"], 1)
+    return df, coincident
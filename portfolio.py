@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+# Billigste sett av tiltak som kutter områdets vintertopp eller årlige nettuttak med ønsket andel.
+# Hvert byggs marginale effekt per tiltak på den samlede nettutvekslingen beregnes samlet på forhånd,
+# deretter velges tiltak grådig etter reduksjon per krone.
+HEATING_MEASURES = ["grunnvarme", "luft_luft_varmepumpe", "fjernvarme"] # høyst ett oppvarmingstiltak per bygg
+# kostnadsanslag (kr), brukes bare til å rangere tiltak mot hverandre
+MEASURE_COSTS = {
+    "grunnvarme" : {"kr_per_kW" : 12000}, # varmepumpe, i tillegg til brønnkostnaden
+    "luft_luft_varmepumpe" : {"kr_per_bygg" : 30000},
+    "fjernvarme" : {"kr_per_kW" : 3000, "kr_per_bygg" : 50000},
+    "solceller" : {"kr_per_kWh" : 14}, # per kWh årlig produksjon
+}
+TARGETS = ["vintereffekt", "energi"]
+TOP_HOURS = 48 # timene ny topp først vurderes på; se greedy_portfolio
+
+def measure_cost(measure, peak, energy, extra = 0):
+    cost = MEASURE_COSTS[measure]
+    return cost.get("kr_per_kW", 0) * peak + cost.get("kr_per_bygg", 0) * (peak > 0) + cost.get("kr_per_kWh", 0) * energy + extra
+
+def candidate_table(deltas, costs):
+    # deltas: {tiltak: (bygg x timer)}, costs: {tiltak: (bygg)} -> én kandidat per (bygg, tiltak) med effekt
+    rows, matrices = [], []
+    for measure, delta in deltas.items():
+        useful = np.flatnonzero(np.any(delta < 0, axis = 1) & np.isfinite(costs[measure]))
+        rows.append(pd.DataFrame({"bygg" : useful, "tiltak" : measure, "kostnad" : costs[measure][useful]}))
+        matrices.append(delta[useful])
+    return pd.concat(rows, ignore_index = True), np.concatenate(matrices).astype(np.float32)
+
+def greedy_portfolio(total, deltas, costs, target = "vintereffekt", reduction = 20, mask = None):
+    # total: (8760) samlet nettutveksling i referansen, deltas <= 0 -> valgte (bygg, tiltak) i valgt rekkefølge, start- og sluttverdi
+    if target not in TARGETS:
+        raise ValueError(f"Ukjent mål '{target}', bruk en av {TARGETS}")
+    mask = np.ones(len(total), dtype = bool) if (mask is None or target == "energi") else mask
+    series = np.asarray(total, dtype = float)[mask]
+    df_candidates, matrix = candidate_table({measure : delta[:, mask] for measure, delta in deltas.items()}, costs)
+    cost = np.maximum(df_candidates["kostnad"].to_numpy(dtype = float), 1)
+    buildings = df_candidates["bygg"].to_numpy()
+    heating = df_candidates["tiltak"].isin(HEATING_MEASURES).to_numpy()
+    available = np.ones(len(df_candidates), dtype = bool)
+    start = series.sum() if target == "energi" else series.max()
+    goal = start * (1 - reduction / 100)
+    chosen = []
+    if target == "energi":
+        # energi er additiv: sorter én gang på kostnad per kWh
+        saving = -matrix.sum(axis = 1)
+        current = start
+        for index in np.argsort(cost / np.maximum(saving, 1e-9)):
+            if current <= goal:
+                break
+            if not available[index]:
+                continue
+            current -= saving[index]
+            chosen.append(index)
+            available[index] = False
+            if heating[index]:
+                available[heating & (buildings == buildings[index])] = False
+    else:
+        # alle deltaer er <= 0, så timene utenfor de TOP_HOURS høyeste kan ikke komme over neste nivå (next_level).
+        # Når kandidatens nye maks i topptimene er minst next_level, er den derfor eksakt ny topp; ellers regnes
+        # ny topp over alle timer for de (få) kandidatene det gjelder. Reduksjonen er dermed eksakt for alle.
+        while series.max() > goal and np.any(available):
+            top = np.argpartition(series, -(TOP_HOURS + 1))[-(TOP_HOURS + 1):]
+            top = top[np.argsort(series[top])[::-1]]
+            peak_hours, next_level = top[:-1], series[top[-1]]
+            candidates = np.flatnonzero(available)
+            shifted = series[peak_hours][None, :] + matrix[np.ix_(candidates, peak_hours)]
+            new_peak = shifted.max(axis = 1)
+            below = np.flatnonzero(new_peak < next_level)
+            if len(below) > 0:
+                new_peak[below] = (series[None, :] + matrix[candidates[below]]).max(axis = 1)
+            peak_reduction = series.max() - new_peak
+            score = np.where(np.any(peak_reduction > 0), peak_reduction, -matrix[np.ix_(candidates, peak_hours)].sum(axis = 1)) / cost[candidates]
+            if score.max() <= 0:
+                break
+            index = candidates[np.argmax(score)]
+            series = series + matrix[index]
+            chosen.append(index)
+            available[index] = False
+            if heating[index]:
+                available[heating & (buildings == buildings[index])] = False
+        current = series.max()
+    df_chosen = df_candidates.loc[chosen].reset_index(drop = True)
+    df_chosen["rekkefolge"] = np.arange(1, len(df_chosen) + 1)
+    df_chosen["akkumulert_kostnad"] = df_chosen["kostnad"].cumsum()
+    return df_chosen, start, current
@@ -0,0 +1,43 @@
+import os
+import numpy as np
+import pandas as pd
+from scenariocatalog import shared_cache
+
+HOURLY_PRICE_FILE = "input/strompris.csv"
+HOURLY_EMISSION_FILE = "input/utslippsfaktor.csv"
+# seriene er felles for alle prosjekter og telles for seg i lagerets minnebruk
+CACHE_PROJECT = "felles"
+
+def import_hourly_series(filename, version):
+    if filename.endswith(".xlsx"):
+        array = pd.read_excel(filename).to_numpy().ravel()
+    else:
+        array = pd.read_csv(filename, sep = None, engine = "python").iloc[:, -1].to_numpy()
+    array = np.asarray(array, dtype = float)
+    if len(array) != 8760:
+        raise ValueError(f"{filename} må inneholde 8760 timesverdier (fant {len(array)})")
+    array.setflags(write = False)
+    return array
+
+def hourly_series(filename):
+    if not os.path.exists(filename):
+        return None
+    version = os.path.getmtime(filename)
+    return shared_cache().get(CACHE_PROJECT, (import_hourly_series.__name__, filename, version), lambda: import_hourly_series(filename, version))
+
+class HourlyFactor:
+    # Pris eller utslippsfaktor, enten som fast verdi eller som timesserie.
+    # Totalen er et skalarprodukt mot den (bufrede) aggregerte serien for utvalget.
+    def __init__(self, value, hourly = None, scale = 1):
+        self.value = value
+        self.hourly = None if hourly is None else hourly * scale
+
+    def key(self):
+        # valgene som bestemmer totalen, for bufring av avledede resultater
+        return (self.value, self.hourly is not None)
+
+    def total(self, array):
+        # array kan også være stablede serier (scenarier x 8760)
+        if self.hourly is None:
+            return self.value * np.sum(array, axis = -1)
+        return np.dot(np.nan_to_num(array), self.hourly)
@@ -0,0 +1,43 @@
+import json
+import os
+from scenariocatalog import MANIFEST_FILENAME, SUMMARY_SUFFIX
+
+# Prosjektene én dashboard-server kan vise. Hvert prosjekt har egen bygningstabell, scenariofil og output-mappe;
+# input/prosjekter.json overstyrer standardoppsettet.
+PROJECTS_FILE = "input/prosjekter.json"
+DEFAULT_PROJECT = "Østmarka"
+DEFAULT_PROJECTS = {
+    "Østmarka" : {
+        "bygningstabell" : "building_table_østmarka.xlsx",
+        "scenariofil" : "input/scenarier.xlsx",
+        "utetemperatur" : "input/utetemperatur.xlsx",
+        "output" : "output",
+        "bygningsmasser" : {
+            "Eksisterende bygningsmasse" : "E",
+            "Planforslag (inkl. dagens bygg som skal bevares)" : "P1",
+            "Planforslag (ekskl. helsebygg)" : "P2",
+            "Planforslag og områdene rundt Østmarka" : "P3"
+        }
+    },
+    "Stjørdal" : {
+        "bygningstabell" : "building_table_stjørdal.xlsx",
+        "scenariofil" : "input/scenarier_2.xlsx",
+        "utetemperatur" : "input/utetemperatur.xlsx",
+        "output" : "output/stjørdal",
+    },
+}
+
+def read_projects(filename = PROJECTS_FILE):
+    if not os.path.exists(filename):
+        return DEFAULT_PROJECTS
+    with open(filename, encoding = "utf-8") as f:
+        return json.load(f)
+
+def available_projects(projects):
+    # prosjekter som er simulert (har et manifest eller sammendrag i output-mappen); de andre vises som ikke simulert
+    names = []
+    for name, project in projects.items():
+        folder_path = project["output"]
+        if os.path.isdir(folder_path) and any(filename.endswith(SUMMARY_SUFFIX) or filename == MANIFEST_FILENAME for filename in os.listdir(folder_path)):
+            names.append(name)
+    return names
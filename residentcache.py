@@ -0,0 +1,120 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Felles lager for alt som lastes fra prosjektenes output-mapper. I stedet for at st.cache_resource holder alt
+# for alltid, holdes innlastede objekter innenfor et minnebudsjett og de minst nylig brukte kastes først.
+BUDGET_ENVIRONMENT_VARIABLE = "ENERGIANALYSE_MINNEBUDSJETT_MB"
+DEFAULT_BUDGET_MB = 2048
+
+def budget_bytes():
+    return int(float(os.environ.get(BUDGET_ENVIRONMENT_VARIABLE, DEFAULT_BUDGET_MB)) * 1024 ** 2)
+
+def resident_size(value, seen = None):
+    # anslått minnebruk i byte; minnemappede blokker ligger i sidecachen og regnes ikke med
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, np.memmap):
+        return 0
+    if isinstance(value, np.ndarray):
+        return value.nbytes if value.base is None or not isinstance(value.base, np.memmap) else 0
+    if isinstance(value, (pa.Table, pa.Array, pa.ChunkedArray)):
+        return value.nbytes
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(np.sum(value.memory_usage(deep = True)))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(resident_size(k, seen) + resident_size(v, seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(resident_size(item, seen) for item in value)
+    if hasattr(value, "__dict__"):
+        return sys.getsizeof(value) + resident_size(vars(value), seen)
+    return sys.getsizeof(value)
+
+class ResidentCache:
+    def __init__(self, budget = None):
+        self.budget = budget_bytes() if budget is None else budget
+        self.entries = OrderedDict() # (prosjekt, nøkkel) -> (verdi, størrelse), eldste først
+        self.loading = {} # (prosjekt, nøkkel) -> lasting som pågår, samtidige forespørsler venter på den
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def __counter(self, project):
+        return self.counters.setdefault(project, {"treff" : 0, "bom" : 0, "samlet" : 0, "kastet" : 0, "lastetid" : 0.0})
+
+    def get(self, project, key, load):
+        entry = (project, key)
+        with self.lock:
+            if entry in self.entries:
+                self.entries.move_to_end(entry)
+                self.__counter(project)["treff"] += 1
+                return self.entries[entry][0]
+            flight = self.loading.get(entry)
+            owner = flight is None
+            if owner:
+                flight = self.loading[entry] = {"ferdig" : threading.Event()}
+                self.__counter(project)["bom"] += 1
+            else:
+                self.__counter(project)["samlet"] += 1
+        if not owner:
+            # samme ressurs lastes allerede (av forvarmingen eller en annen sesjon): vent på den i stedet for å laste på nytt
+            flight["ferdig"].wait()
+            if "feil" in flight:
+                raise flight["feil"]
+            return flight["verdi"]
+        start_time = time.time()
+        try:
+            value = load()
+            size = resident_size(value)
+        except BaseException as error:
+            flight["feil"] = error
+            raise
+        finally:
+            with self.lock:
+                del self.loading[entry]
+                if "feil" not in flight:
+                    self.__counter(project)["lastetid"] += time.time() - start_time
+                    self.entries[entry] = (value, size)
+                    flight["verdi"] = value
+                    self.__evict(keep = entry)
+            flight["ferdig"].set()
+        return value
+
+    def __evict(self, keep):
+        # det som nettopp ble lastet blir liggende selv om det alene er større enn budsjettet
+        while self.resident_bytes() > self.budget and len(self.entries) > 1:
+            oldest = next(iter(self.entries))
+            if oldest == keep:
+                self.entries.move_to_end(oldest)
+                continue
+            del self.entries[oldest]
+            self.__counter(oldest[0])["kastet"] += 1
+
+    def resident_bytes(self, project = None):
+        return sum(size for (entry_project, key), (value, size) in self.entries.items() if project is None or entry_project == project)
+
+    def clear(self, project = None):
+        with self.lock:
+            for entry in [entry for entry in self.entries if project is None or entry[0] == project]:
+                del self.entries[entry]
+
+    def metrics(self):
+        with self.lock:
+            rows = []
+            for project, counter in self.counters.items():
+                entries = [entry for entry in self.entries if entry[0] == project]
+                rows.append({
+                    "prosjekt" : project,
+                    "objekter" : len(entries),
+                    "minne_mb" : self.resident_bytes(project) / 1024 ** 2,
+                    **counter
+                })
+        df = pd.DataFrame(rows, columns = ["prosjekt", "objekter", "minne_mb", "treff", "bom", "samlet", "kastet", "lastetid"])
+        df.attrs["budsjett_mb"] = self.budget / 1024 ** 2
+        return df
@@ -0,0 +1,27 @@
+import numpy as np
+from peakanalysis import HOURS_IN_MONTHS, group_sum
+
+MONTH_STARTS = np.concatenate([[0], np.cumsum(HOURS_IN_MONTHS)[:-1]])
+
+def rollup_cube(df, matrices, keys, measure_columns, area_column, scenario_name):
+    # scenario x nøkler x måned -> energi (sum), effekt (samtidig maks i gruppen) og antall bygg
+    df = df.reset_index(drop = True)
+    labels = df.groupby(keys, sort = True, dropna = False).ngroup().to_numpy()
+    df_groups = df.groupby(keys, sort = True, dropna = False).agg(
+        antall_bygg = (keys[0], "size"),
+        **{f"antall_{column}" : (column, "sum") for column in measure_columns},
+        **{area_column : (area_column, "sum")}
+        ).reset_index()
+    n_groups = len(df_groups)
+    df_cube = df_groups.loc[np.repeat(np.arange(n_groups), 12)].reset_index(drop = True)
+    df_cube.insert(0, "scenario", scenario_name)
+    df_cube.insert(len(keys) + 1, "maaned", np.tile(np.arange(1, 13), n_groups))
+    for series_name, matrix in matrices.items():
+        groups, inverse, aggregated = group_sum(np.nan_to_num(matrix), labels)
+        monthly_sum = np.zeros((n_groups, 12))
+        monthly_max = np.zeros((n_groups, 12))
+        monthly_sum[groups] = np.add.reduceat(aggregated, MONTH_STARTS, axis = 1)
+        monthly_max[groups] = np.maximum.reduceat(aggregated, MONTH_STARTS, axis = 1)
+        df_cube[f"{series_name}_sum"] = monthly_sum.ravel()
+        df_cube[f"{series_name}_maks"] = monthly_max.ravel()
+    return df_cube
@@ -0,0 +1,273 @@
+import json
+import os
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+from superposition import CompressedHourlyData
+from aggregation import selection_membership
+from composer import MeasureDeltas, DELTAS_SUFFIX, INDEX_SUFFIX
+from residentcache import ResidentCache
+
+MANIFEST_FILENAME = "manifest.json"
+SUMMARY_SUFFIX = "_unfiltered.csv"
+HOURLY_SUFFIX = "_timedata.csv"
+PEAKS_SUFFIX = "_effekttopper.csv"
+CUBE_SUFFIX = "_kube.csv"
+GROUPS_SUFFIX = "_grupper.csv"
+COMPRESSED_SUFFIX = "_komprimert.csv"
+RESIDUAL_SUFFIX = "_residualer.csv"
+BASIS_SUFFIX = "_basisprofiler.csv" # per scenario, så koeffisientene alltid leses mot basisen de ble laget med
+WEATHER_SUFFIX = "_vaeraar.csv"
+
+def file_version(filename):
+    try:
+        return os.path.getmtime(filename)
+    except OSError:
+        return None
+
+def manifest_hash(folder_path, scenario_name):
+    # hash for scenariospesifikasjonen siste simulering ble gjort med, None hvis ukjent
+    manifest_path = f"{folder_path}/{MANIFEST_FILENAME}"
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, encoding = "utf-8") as f:
+        entries = json.load(f)["scenarier"]
+    for entry in entries:
+        if entry["navn"] == scenario_name and os.path.exists(f"{folder_path}/{entry['sammendrag']}"):
+            return entry.get("hash")
+    return None
+
+def write_manifest_entry(folder_path, scenario_name, groupings = (), compressed = False, spec_hash = None, weather = False):
+    manifest_path = f"{folder_path}/{MANIFEST_FILENAME}"
+    entries = []
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding = "utf-8") as f:
+            entries = json.load(f)["scenarier"]
+    entries = [entry for entry in entries if entry["navn"] != scenario_name]
+    entries.append({
+        "navn" : scenario_name,
+        "sammendrag" : f"{scenario_name}{SUMMARY_SUFFIX}",
+        "timedata" : f"{scenario_name}{HOURLY_SUFFIX}",
+        "effekttopper" : f"{scenario_name}{PEAKS_SUFFIX}",
+        "kube" : f"{scenario_name}{CUBE_SUFFIX}",
+        "grupper" : f"{scenario_name}{GROUPS_SUFFIX}",
+        "aggregert" : {grouping : f"{scenario_name}_aggregert_{grouping}.csv" for grouping in groupings},
+        "hash" : spec_hash
+    })
+    if compressed:
+        entries[-1].update({
+            "komprimert" : f"{scenario_name}{COMPRESSED_SUFFIX}",
+            "residualer" : f"{scenario_name}{RESIDUAL_SUFFIX}",
+            "basis" : f"{scenario_name}{BASIS_SUFFIX}"
+        })
+    if weather:
+        entries[-1]["vaeraar"] = f"{scenario_name}{WEATHER_SUFFIX}"
+    with open(manifest_path, "w", encoding = "utf-8") as f:
+        json.dump({"scenarier" : entries}, f, ensure_ascii = False, indent = 2)
+
+def read_manifest(folder_path, version):
+    manifest_path = f"{folder_path}/{MANIFEST_FILENAME}"
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding = "utf-8") as f:
+            return json.load(f)["scenarier"]
+    # uten manifest indekseres mappen ut fra filnavnene
+    entries = []
+    for filename in sorted(os.listdir(folder_path)):
+        if filename.endswith(SUMMARY_SUFFIX):
+            scenario_name = filename.split(sep = "_")[0]
+            entries.append({
+                "navn" : scenario_name,
+                "sammendrag" : filename,
+                "timedata" : f"{scenario_name}{HOURLY_SUFFIX}",
+                "effekttopper" : f"{scenario_name}{PEAKS_SUFFIX}",
+                "kube" : f"{scenario_name}{CUBE_SUFFIX}"
+            })
+    return entries
+
+SHARED_CACHE = ResidentCache()
+
+def shared_cache():
+    # ett lager for alle sesjoner og prosjekter, begrenset av minnebudsjettet (se residentcache.py).
+    # Holdes på modulnivå så forvarmingen kan fylle det fra en egen tråd før første sesjon starter.
+    return SHARED_CACHE
+
+# Resultatene deles mellom alle sesjoner og skal aldri endres etter lasting:
+# sammendrag holdes som Arrow-tabeller og timedata som skrivebeskyttede numpy-blokker.
+# version er med i nøkkelen i det felles lageret, så endrede filer lastes på nytt.
+def load_summary(filename, version):
+    table = pa_csv.read_csv(filename)
+    return table
+
+def load_peaks(filename, version):
+    # id blander objectid og gruppenavn; typen kan ikke utledes fra første blokk
+    return pa_csv.read_csv(filename, convert_options = pa_csv.ConvertOptions(column_types = {"id" : pa.string()}))
+
+def load_hourly(filename, version):
+    table = pa_csv.read_csv(filename)
+    return HourlyData(table)
+
+def load_compressed_hourly(coefficient_filename, residual_filename, basis_filename, version):
+    return CompressedHourlyData(pa_csv.read_csv(coefficient_filename), pa_csv.read_csv(residual_filename), pa_csv.read_csv(basis_filename))
+
+def load_measure_deltas(deltas_filename, index_filename, version):
+    return MeasureDeltas(deltas_filename, index_filename)
+
+def read_only(array):
+    array.setflags(write = False)
+    return array
+
+class HourlyData:
+    SERIES_ID = "ID"
+    METADATA_COLUMNS = ["", "Unnamed: 0", "ID", "scenario", "scenario_navn"]
+
+    def __init__(self, table):
+        self.object_ids = [column for column in table.column_names if column not in self.METADATA_COLUMNS]
+        self.column_index = {object_id : index for index, object_id in enumerate(self.object_ids)}
+        self.series_ids = pc.unique(table[self.SERIES_ID]).to_pylist()
+        # (serier x bygg x timer), slik at et utvalg av bygg er sammenhengende rader
+        block = np.empty((len(self.series_ids), len(self.object_ids), 8760))
+        for i, series_id in enumerate(self.series_ids):
+            table_series = table.filter(pc.equal(table[self.SERIES_ID], series_id))
+            for j, object_id in enumerate(self.object_ids):
+                block[i, j] = table_series[object_id].to_numpy()
+        self.block = read_only(block)
+
+    def columns(self, object_ids):
+        return [self.column_index[object_id] for object_id in object_ids if object_id in self.column_index]
+
+    def aggregate(self, object_ids):
+        sums = self.block[:, self.columns(object_ids), :].sum(axis = 1)
+        return {series_id : sums[i] for i, series_id in enumerate(self.series_ids)}
+
+    def aggregate_groups(self, groups):
+        # flere utvalg samtidig: ett sparse matriseprodukt per serie -> {serie: (grupper x 8760)}
+        membership = selection_membership(groups, self.column_index)
+        return {series_id : membership @ self.block[i] for i, series_id in enumerate(self.series_ids)}
+
+    def series_block(self, series_id):
+        # (bygg x timer) for én serie, i rekkefølgen til object_ids
+        return self.block[self.series_ids.index(series_id)]
+
+class StackedHourly:
+    # Én serie for flere scenarier i én blokk (bygg x scenarier*8760), slik at et utvalg summeres for
+    # alle scenarioene i ett sparse matriseprodukt. Bygg som mangler i et scenario bidrar med null.
+    def __init__(self, hourly_data, series_id):
+        self.object_ids = list(dict.fromkeys(object_id for hourly in hourly_data for object_id in hourly.object_ids))
+        self.column_index = {object_id : index for index, object_id in enumerate(self.object_ids)}
+        self.scenarios = len(hourly_data)
+        block = np.zeros((len(self.object_ids), self.scenarios, 8760))
+        for i, hourly in enumerate(hourly_data):
+            if series_id in hourly.series_ids:
+                block[[self.column_index[object_id] for object_id in hourly.object_ids], i] = hourly.series_block(series_id)
+        self.block = read_only(block.reshape(len(self.object_ids), -1))
+
+    def aggregate_groups(self, groups):
+        # -> (grupper x scenarier x 8760)
+        membership = selection_membership(groups, self.column_index)
+        return np.asarray(membership @ self.block).reshape(len(groups), self.scenarios, 8760)
+
+    def aggregate(self, object_ids):
+        return self.aggregate_groups([object_ids])[0]
+
+class ScenarioCatalog:
+    REFERENCE_SCENARIO = "Referansesituasjon"
+
+    def __init__(self, folder_path, project = None, cache = None):
+        self.folder_path = folder_path
+        self.project = folder_path if project is None else project
+        self.cache = shared_cache() if cache is None else cache
+        # manifestet endres uten at mappen gjør det; mappens tid brukes bare når filnavnene må leses
+        self.manifest_version = file_version(f"{folder_path}/{MANIFEST_FILENAME}") or file_version(folder_path)
+        self.entries = {entry["navn"] : entry for entry in self.__load(read_manifest, folder_path, self.manifest_version)}
+        self.scenario_names = list(self.entries.keys())
+
+    def cached(self, key, load):
+        # alt som lastes eller avledes fra prosjektet holdes i det felles lageret og teller mot prosjektets minnebruk
+        return self.cache.get(self.project, key, load)
+
+    def __load(self, loader, *args):
+        return self.cached((loader.__name__, *args), lambda: loader(*args))
+
+    def __path(self, scenario_name, key):
+        return f"{self.folder_path}/{self.entries[scenario_name][key]}"
+
+    def dataset_key(self):
+        versions = [tuple(file_version(f"{self.folder_path}/{filename}") for key, filename in entry.items() if key not in ("navn", "hash") and isinstance(filename, str)) for entry in self.entries.values()]
+        return (self.folder_path, tuple(versions))
+
+    def summary_table(self, scenario_name):
+        filename = self.__path(scenario_name, "sammendrag")
+        return self.__load(load_summary, filename, file_version(filename))
+
+    def building_areas(self):
+        return pc.unique(self.summary_table(self.REFERENCE_SCENARIO)["bygningsomraadeid"]).to_pylist()
+
+    def __filtered_summary(self, scenario_name, column, values):
+        table = self.summary_table(scenario_name)
+        if column is not None:
+            # utvalget har objectid som tekst, sammendraget som tall
+            table = table.filter(pc.is_in(table[column], value_set = pa.array(values).cast(table.schema.field(column).type)))
+        return table
+
+    def summary(self, scenario_name, column = None, values = None):
+        return self.__filtered_summary(scenario_name, column, values).to_pandas()
+
+    def summary_sums(self, scenario_name, names, column = None, values = None):
+        # kolonnesummer for et utvalg direkte på Arrow-tabellen; kolonner som mangler i scenariet gir 0
+        table = self.__filtered_summary(scenario_name, column, values)
+        return {name : (pc.sum(table[name]).as_py() or 0) if name in table.column_names else 0 for name in names}
+
+    def has_hourly(self, scenario_name):
+        entry = self.entries[scenario_name]
+        keys = ["komprimert", "residualer", "basis"] if "komprimert" in entry else ["timedata"]
+        return all(file_version(f"{self.folder_path}/{entry[key]}") is not None for key in keys)
+
+    def hourly(self, scenario_name):
+        entry = self.entries[scenario_name]
+        if "komprimert" in entry:
+            filenames = [f"{self.folder_path}/{entry[key]}" for key in ["komprimert", "residualer", "basis"]]
+            return self.__load(load_compressed_hourly, *filenames, tuple(file_version(filename) for filename in filenames))
+        filename = self.__path(scenario_name, "timedata")
+        return self.__load(load_hourly, filename, file_version(filename))
+
+    def stacked_hourly(self, scenario_names, series_id):
+        key = ("stablet", self.dataset_key(), tuple(scenario_names), series_id)
+        return self.cached(key, lambda: StackedHourly([self.hourly(scenario_name) for scenario_name in scenario_names], series_id))
+
+    def __optional_table(self, scenario_name, key, suffix, loader = load_summary):
+        filename = f"{self.folder_path}/{self.entries[scenario_name].get(key, scenario_name + suffix)}"
+        version = file_version(filename)
+        if version is None:
+            return None
+        return self.__load(loader, filename, version)
+
+    def peaks(self, scenario_name):
+        table = self.__optional_table(scenario_name, "effekttopper", PEAKS_SUFFIX, loader = load_peaks)
+        return None if table is None else table.to_pandas()
+
+    def cube(self, scenario_name, building_area = None):
+        table = self.__optional_table(scenario_name, "kube", CUBE_SUFFIX)
+        if table is None:
+            return None
+        if building_area is not None:
+            table = table.filter(pc.equal(table["bygningsomraadeid"], building_area))
+        return table.to_pandas()
+
+    def group_summary(self, scenario_name):
+        table = self.__optional_table(scenario_name, "grupper", GROUPS_SUFFIX)
+        return None if table is None else table.to_pandas()
+
+    def group_hourly(self, scenario_name, grouping):
+        filename = f"{self.folder_path}/{self.entries[scenario_name].get('aggregert', {}).get(grouping, f'{scenario_name}_aggregert_{grouping}.csv')}"
+        version = file_version(filename)
+        if version is None:
+            return None
+        return self.__load(load_hourly, filename, version)
+
+    def measure_deltas(self, scenario_name = REFERENCE_SCENARIO):
+        filenames = [f"{self.folder_path}/{scenario_name}{suffix}" for suffix in [DELTAS_SUFFIX, INDEX_SUFFIX]]
+        version = tuple(file_version(filename) for filename in filenames)
+        if None in version:
+            return None
+        return self.__load(load_measure_deltas, *filenames, version)
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+import re
+import numpy as np
+import pandas as pd
+
+# Scenarioarket kompileres én gang til en JSON-spesifikasjon med andeler per (energiområde, bygningstype).
+# Koder som G40_S20_T10: bokstav for tiltak og 0-100 prosent, skilt med "_".
+SPEC_VERSION = 1
+SPEC_FILE = "output/scenarier.json"
+CODE_PATTERN = re.compile(r"^([GSVFOTE])(\d{1,3})$")
+MEASURE_CODES = {
+    "G" : "grunnvarme",
+    "S" : "solceller",
+    "V" : "luft_luft_varmepumpe",
+    "F" : "fjernvarme",
+    "O" : "oppgraderes",
+    "T" : "reduksjon_termiskbehov",
+    "E" : "reduksjon_elektriskbehov",
+}
+
+class ScenarioSpecError(ValueError):
+    pass
+
+def parse_code(code, location = ""):
+    # "G40_S20" -> {"grunnvarme": 40, "solceller": 20}
+    shares = {}
+    for part in str(code).strip().split("_"):
+        match = CODE_PATTERN.match(part.strip().upper())
+        if match is None:
+            raise ScenarioSpecError(f"Ugyldig kode '{part}' i '{code}'{location}")
+        measure, percentage = MEASURE_CODES[match.group(1)], int(match.group(2))
+        if percentage > 100:
+            raise ScenarioSpecError(f"Prosent kan ikke være over 100% ('{part}'{location})")
+        if measure in shares:
+            raise ScenarioSpecError(f"Tiltaket '{part[0]}' er oppgitt flere ganger i '{code}'{location}")
+        shares[measure] = percentage
+    return shares
+
+def content_hash(shares):
+    # rekkefølgen på tiltakene betyr noe (varme_finnes), så nøklene sorteres ikke
+    return hashlib.sha256(json.dumps(shares, ensure_ascii = False).encode("utf-8")).hexdigest()[:16]
+
+def compile_sheet(scenario_name, df):
+    # rader er energiområder, kolonner bygningstyper
+    shares = {}
+    for energy_id, row in df.iterrows():
+        shares[str(energy_id)] = {}
+        for building_type, code in row.items():
+            if pd.isna(code):
+                continue
+            shares[str(energy_id)][str(building_type)] = parse_code(code, location = f" (ark '{scenario_name}', {energy_id}/{building_type})")
+    return {"navn" : scenario_name, "hash" : content_hash(shares), "andeler" : shares}
+
+def compile_workbook(filename):
+    sheets = pd.read_excel(filename, sheet_name = None, index_col = 0)
+    return [compile_sheet(scenario_name, df) for scenario_name, df in sheets.items()]
+
+def data_hash(values):
+    # for inndata som ikke ligger i en fil (f.eks. PROFET-profiler hentet fra API-et)
+    return hashlib.sha256(np.ascontiguousarray(values, dtype = float).tobytes()).hexdigest()[:16]
+
+def source_signature(filename):
+    return f"{os.path.getmtime(filename)}:{os.path.getsize(filename)}"
+
+def write_spec(scenarios, filename, source = None):
+    with open(filename, "w", encoding = "utf-8") as f:
+        json.dump({"versjon" : SPEC_VERSION, "kilde" : source, "scenarier" : scenarios}, f, ensure_ascii = False, indent = 2)
+
+def read_spec(filename):
+    with open(filename, encoding = "utf-8") as f:
+        spec = json.load(f)
+    for scenario in spec["scenarier"]:
+        scenario["hash"] = content_hash(scenario["andeler"])
+    return spec
+
+def load_scenarios(filename, spec_file = SPEC_FILE):
+    # en JSON-spesifikasjon brukes direkte; et regneark kompileres bare når det er endret
+    if filename.endswith(".json"):
+        return read_spec(filename)["scenarier"]
+    source = f"{filename}:{source_signature(filename)}"
+    if os.path.exists(spec_file):
+        spec = read_spec(spec_file)
+        if spec.get("versjon") == SPEC_VERSION and spec.get("kilde") == source:
+            return spec["scenarier"]
+    scenarios = compile_workbook(filename)
+    write_spec(scenarios, spec_file, source = source)
+    return scenarios
+
+def scenario_hash(scenario, reference = None, inputs = ()):
+    # et scenario er uendret hvis egne andeler, referansen det bygger på og inndata er like
+    parts = [scenario["hash"], reference["hash"] if reference is not None else ""] + [str(value) for value in inputs]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,81 @@
+import streamlit as st
+
+class SelectionCache:
+    GRID = "_nettutveksling_energi_liste"
+    THERMAL_DEMAND_FOR_CALCULATION = "_termisk_energibehov"
+    ELECTRIC_DEMAND_FOR_CALCULATION = "_elektrisk_energibehov"
+    SPACEHEATING_DEMAND = "_romoppvarming_energibehov"
+    DHW_DEMAND = "_tappevann_energibehov"
+    ELECTRIC_DEMAND = "_elspesifikt_energibehov"
+    # utgangspunkt for sammenligning (før tiltak)
+    REFERENCE = "_referanse_energi_liste"
+    REFERENCE_ELECTRIC_DEMAND = "_referanse_elspesifikt_liste"
+
+    SESSION_KEY = "selection_cache"
+    # etter så mange inkrementelle oppdateringer regnes aggregatet på nytt for å unngå akkumulert avrundingsfeil
+    MAX_INCREMENTAL_UPDATES = 50
+
+    def __init__(self, dataset_key, selection_key, aggregate_function):
+        # aggregate_function(scenario_name, object_ids) -> {serie: summert timeserie}
+        self.aggregate_function = aggregate_function
+        state = st.session_state.get(self.SESSION_KEY)
+        if state is None or state["dataset_key"] != dataset_key:
+            state = self.__new_state(dataset_key, selection_key)
+        elif state["selection_key"] != selection_key:
+            state = self.__update_selection(state, selection_key)
+        st.session_state[self.SESSION_KEY] = state
+        self.state = state
+
+    def __new_state(self, dataset_key, selection_key):
+        return {
+            "dataset_key" : dataset_key,
+            "selection_key" : selection_key,
+            "results" : {},
+            "derived" : {},
+            "updates" : 0
+        }
+
+    def __update_selection(self, state, selection_key):
+        # endret polygon: legg til byggene som kom inn og trekk fra de som falt ut, i stedet for å summere alt på nytt
+        previous, current = set(state["selection_key"]), set(selection_key)
+        entering, leaving = sorted(current - previous), sorted(previous - current)
+        if len(entering) + len(leaving) >= len(current) or state["updates"] >= self.MAX_INCREMENTAL_UPDATES:
+            return self.__new_state(state["dataset_key"], selection_key)
+        results = {}
+        for scenario_name, scenario_results in state["results"].items():
+            added = self.aggregate_function(scenario_name, entering) if len(entering) > 0 else {}
+            removed = self.aggregate_function(scenario_name, leaving) if len(leaving) > 0 else {}
+            updated = {}
+            for series_name, array in scenario_results.items():
+                if series_name in [self.REFERENCE, self.REFERENCE_ELECTRIC_DEMAND]:
+                    continue
+                updated[series_name] = array + added.get(series_name, 0) - removed.get(series_name, 0)
+            results[scenario_name] = self.__add_reference_arrays(updated)
+        return {
+            "dataset_key" : state["dataset_key"],
+            "selection_key" : selection_key,
+            "results" : results,
+            "derived" : {},
+            "updates" : state["updates"] + 1
+        }
+
+    def __add_reference_arrays(self, results):
+        thermal_array = results[self.THERMAL_DEMAND_FOR_CALCULATION]
+        results[self.REFERENCE] = thermal_array + results[self.ELECTRIC_DEMAND_FOR_CALCULATION]
+        results[self.REFERENCE_ELECTRIC_DEMAND] = thermal_array + results[self.ELECTRIC_DEMAND]
+        return results
+
+    def get(self, scenario_name):
+        results = self.state["results"]
+        if scenario_name not in results:
+            results[scenario_name] = self.__add_reference_arrays(self.aggregate_function(scenario_name, list(self.state["selection_key"])))
+        return results[scenario_name]
+
+    def derived(self, scenario_name, name, function):
+        # resultater avledet av aggregatet (f.eks. tariffkostnad), bufret per utvalg.
+        # Med scenario_name = None gjelder resultatet alle scenarier og function får byggene i utvalget.
+        derived = self.state["derived"]
+        if (scenario_name, name) not in derived:
+            argument = list(self.state["selection_key"]) if scenario_name is None else self.get(scenario_name)
+            derived[(scenario_name, name)] = function(argument)
+        return derived[(scenario_name, name)]
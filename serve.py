@@ -0,0 +1,12 @@
+import sys
+from warmup import wait_for_warmup
+
+# Starter dashboardet med forvarmede data: python serve.py [argumenter til streamlit run]
+# Serveren tar imot forespørsler (og svarer på helsesjekken) først når forvarmingen er ferdig eller
+# WARMUP_TIMEOUT har gått. Forvarmingen fortsetter da i bakgrunnen, og sesjoner som ber om noe som
+# lastes, venter på den samme lastingen i stedet for å starte en ny.
+if __name__ == "__main__":
+    wait_for_warmup()
+    from streamlit.web import cli
+    sys.argv = ["streamlit", "run", "app.py", *sys.argv[1:]]
+    sys.exit(cli.main())
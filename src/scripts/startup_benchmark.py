@@ -0,0 +1,58 @@
+import re
+import subprocess
+import sys
+import numpy as np
+
+# Måler importtiden for dashboardet i en ny prosess, slik en ny container opplever den.
+# Kjøres fra rotmappen: python src/scripts/startup_benchmark.py [budsjett i sekunder]
+# Feiler hvis importen tar lengre tid enn budsjettet eller hvis tunge pakker lastes ved oppstart.
+IMPORT_BUDGET_SECONDS = 3.0
+RUNS = 5
+STARTUP_MODULE = "app"
+# skal bare importeres i visningen eller analysen som bruker dem
+DEFERRED_MODULES = [
+    "geopandas", "shapely", "pyproj", "folium", "streamlit_folium", "statsmodels", "plotly.figure_factory",
+    "streamlit_extras", "sklearn", "swifter", "requests_oauthlib", "energyanalysis"
+]
+IMPORTTIME_PATTERN = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def import_time(module):
+    # -> sekunder for hele importen og egen importtid summert per pakke
+    code = f"import sys, {module}; print(','.join(sorted(sys.modules)))"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output = True, text = True, check = True)
+    packages = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if match is None:
+            continue
+        own, cumulative, indent, name = int(match.group(1)), int(match.group(2)), len(match.group(3)), match.group(4)
+        if indent == 1:
+            total += cumulative
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + own
+    return total / 1e6, {package : value / 1e6 for package, value in packages.items()}, result.stdout.strip().split(",")
+
+def main():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else IMPORT_BUDGET_SECONDS
+    totals, package_runs, loaded = [], {}, set()
+    for run in range(RUNS):
+        total, packages, modules = import_time(STARTUP_MODULE)
+        totals.append(total)
+        loaded.update(modules)
+        for package, value in packages.items():
+            package_runs.setdefault(package, []).append(value)
+    print(f"Import av {STARTUP_MODULE}: median {np.median(totals):.2f} s, maks {np.max(totals):.2f} s (budsjett {budget:.2f} s)")
+    # median over kjøringene; en pakke som mangler i en kjøring teller som 0 der
+    packages = {package : np.median(values + [0] * (RUNS - len(values))) for package, values in package_runs.items()}
+    print(f"Tregeste pakker (median av {RUNS} kjøringer):")
+    for package, value in sorted(packages.items(), key = lambda item: -item[1])[:10]:
+        print(f"  {package:<30}{value:.3f} s")
+    eager = [module for module in DEFERRED_MODULES if module in loaded]
+    if len(eager) > 0:
+        print(f"Lastes ved oppstart, men skal utsettes: {', '.join(eager)}")
+    if np.median(totals) > budget or len(eager) > 0:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+# Batteri- og varmelager på nettutvekslingen. Alle bygg (eller energiområder) kjøres samtidig:
+# rekursjonen går time for time, men hvert steg er en vektoroperasjon over hele blokken.
+POLICIES = ["egenforbruk", "topplastkutt"]
+# per bygningstype: kapasitet (kWh per m2 BRA), effekt (kW per m2 BRA), virkningsgrad tur/retur og tap per time
+STORAGE_TYPES = {
+    "batteri" : {
+        "default" : {"kapasitet" : 0.07, "effekt" : 0.035, "virkningsgrad" : 0.9, "tap" : 0.0},
+    },
+    "varmtvann" : {
+        "default" : {"kapasitet" : 0.05, "effekt" : 0.02, "virkningsgrad" : 1.0, "tap" : 0.005},
+        "Hus" : {"kapasitet" : 0.08, "effekt" : 0.02, "virkningsgrad" : 1.0, "tap" : 0.005},
+        "Leilighet" : {"kapasitet" : 0.06, "effekt" : 0.02, "virkningsgrad" : 1.0, "tap" : 0.005},
+    },
+}
+BISECTION_STEPS = 12
+
+def storage_parameters(storage_type, building_types, areas):
+    # -> kapasitet, effekt, virkningsgrad og tap per bygg
+    table = STORAGE_TYPES[storage_type]
+    parameters = [table.get(building_type, table["default"]) for building_type in building_types]
+    areas = np.asarray(areas, dtype = float)
+    return (
+        np.array([p["kapasitet"] for p in parameters]) * areas,
+        np.array([p["effekt"] for p in parameters]) * areas,
+        np.array([p["virkningsgrad"] for p in parameters]),
+        np.array([p["tap"] for p in parameters]),
+    )
+
+def dispatch(balance, capacity, power, efficiency = 1, loss = 0, threshold = None, discharge_limit = None):
+    # balance: (rader x 8760) nettutveksling, positiv = kjøp. threshold = None gir egenforbruk (lad fra overskudd,
+    # lever ved kjøp); med threshold lades lageret fra nettet under terskelen og leverer over den (topplastkutt).
+    # discharge_limit begrenser levering per time (varmelager kan bare dekke varmebehovet).
+    balance = np.nan_to_num(np.atleast_2d(np.asarray(balance, dtype = float)))
+    rows = balance.shape[0]
+    capacity, power = np.broadcast_to(capacity, (rows,)), np.broadcast_to(power, (rows,))
+    charge_efficiency = np.sqrt(np.broadcast_to(efficiency, (rows,)))
+    retention = 1 - np.broadcast_to(loss, (rows,))
+    level = np.zeros(rows) if threshold is None else np.broadcast_to(threshold, (rows,))
+    limit = np.full(balance.shape, np.inf) if discharge_limit is None else np.atleast_2d(discharge_limit)
+    soc = np.zeros(rows)
+    exchange = np.zeros_like(balance) # positiv = lading (øker nettuttaket)
+    state = np.zeros_like(balance)
+    for hour in range(balance.shape[1]):
+        soc = soc * retention
+        excess = balance[:, hour] - level
+        discharge = np.minimum.reduce([np.maximum(excess, 0), power, soc * charge_efficiency, limit[:, hour]])
+        charge = np.minimum.reduce([np.maximum(-excess, 0), power, (capacity - soc) / charge_efficiency])
+        soc = soc + charge * charge_efficiency - discharge / charge_efficiency
+        exchange[:, hour] = charge - discharge
+        state[:, hour] = soc
+    return balance + exchange, exchange, state
+
+def peak_shaving_threshold(balance, capacity, power, efficiency = 1, loss = 0, discharge_limit = None, mask = None):
+    # laveste terskel per rad som lageret klarer å holde, funnet med bisection for alle rader samtidig
+    balance = np.nan_to_num(np.atleast_2d(np.asarray(balance, dtype = float)))
+    mask = np.ones(balance.shape[1], dtype = bool) if mask is None else mask
+    upper = np.max(balance[:, mask], axis = 1)
+    lower = np.maximum(upper - np.broadcast_to(power, upper.shape), np.min(balance[:, mask], axis = 1))
+    for step in range(BISECTION_STEPS):
+        middle = (lower + upper) / 2
+        shaved = dispatch(balance, capacity, power, efficiency, loss, threshold = middle, discharge_limit = discharge_limit)[0]
+        feasible = np.max(shaved[:, mask], axis = 1) <= middle + 1e-6
+        upper = np.where(feasible, middle, upper)
+        lower = np.where(feasible, lower, middle)
+    return upper
+
+def run_storage(balance, capacity, power, efficiency = 1, loss = 0, policy = "egenforbruk", discharge_limit = None, mask = None):
+    if policy not in POLICIES:
+        raise ValueError(f"Ukjent styring '{policy}', bruk en av {POLICIES}")
+    threshold = None
+    if policy == "topplastkutt":
+        threshold = peak_shaving_threshold(balance, capacity, power, efficiency, loss, discharge_limit, mask)
+    return dispatch(balance, capacity, power, efficiency, loss, threshold, discharge_limit)
+
+def storage_summary(labels, before, after, exchange):
+    return pd.DataFrame({
+        "id" : labels,
+        "effekt_uten_lager" : np.max(before, axis = 1),
+        "effekt_med_lager" : np.max(after, axis = 1),
+        "energi_uten_lager" : np.sum(before, axis = 1),
+        "energi_med_lager" : np.sum(after, axis = 1),
+        "levert_fra_lager" : -np.sum(np.minimum(exchange, 0), axis = 1),
+    })
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from aggregation import selection_membership
+
+# Bygg beregnet fra PROFET er skalerte kopier av noen få basisprofiler. Hver timeserie lagres som
+# (basisprofil, skala) og et eksplisitt restledd bare der ikke-lineære steg slår inn
+# (dekningsgrad, luft-luft-varmepumpe, målte data).
+TOLERANCE = 1e-6
+
+def basis_matrix(profiles):
+    # profiles: {navn: 8760 verdier} -> navn, (basis x 8760)
+    names = list(profiles.keys())
+    basis = np.array([np.nan_to_num(np.asarray(profiles[name], dtype = float)) for name in names])
+    return names, basis
+
+def compress(matrices, object_ids, candidate_basis, basis_names, basis):
+    # candidate_basis: liste med basisnavn per bygg; minste kvadraters tilpasning per gruppe av like bygg
+    position = {name : index for index, name in enumerate(basis_names)}
+    candidate_keys = [tuple(candidates) for candidates in candidate_basis]
+    coefficient_rows = []
+    residuals = {series_name : {} for series_name in matrices}
+    for candidates in set(candidate_keys):
+        members = np.array([i for i, key in enumerate(candidate_keys) if key == candidates])
+        basis_group = basis[[position[name] for name in candidates]].T
+        for series_name, matrix in matrices.items():
+            y = np.nan_to_num(matrix[members]).T
+            coefficients = np.linalg.lstsq(basis_group, y, rcond = None)[0]
+            residual = y - basis_group @ coefficients
+            exact = np.max(np.abs(residual), axis = 0) <= TOLERANCE * np.maximum(1, np.max(np.abs(y), axis = 0))
+            for j, member in enumerate(members):
+                for k, name in enumerate(candidates):
+                    if coefficients[k, j] != 0:
+                        coefficient_rows.append((object_ids[member], series_name, name, coefficients[k, j]))
+                if not exact[j]:
+                    residuals[series_name][object_ids[member]] = residual[:, j]
+    df_coefficients = pd.DataFrame(coefficient_rows, columns = ["objectid", "ID", "basis", "skala"])
+    return df_coefficients, residual_timedata(residuals)
+
+def residual_timedata(residuals):
+    # én rad per (serie, bygg) som ikke er eksakt: ID, objectid og de 8760 timeverdiene
+    pairs = [(series_name, object_id) for series_name, series in residuals.items() for object_id in series]
+    values = np.array([residuals[series_name][object_id] for series_name, object_id in pairs]).reshape(len(pairs), 8760)
+    df = pd.DataFrame(values, columns = [str(hour) for hour in range(8760)])
+    df.insert(0, "objectid", [object_id for series_name, object_id in pairs])
+    df.insert(0, "ID", [series_name for series_name, object_id in pairs])
+    return df
+
+class CompressedHourlyData:
+    SERIES_ID = "ID"
+    METADATA_COLUMNS = ["", "Unnamed: 0", "ID", "objectid", "scenario", "scenario_navn"]
+
+    def __init__(self, coefficient_table, residual_table, basis_table):
+        self.basis_names = [column for column in basis_table.column_names if column not in self.METADATA_COLUMNS]
+        self.basis = np.array([basis_table[name].to_numpy() for name in self.basis_names], dtype = float)
+        basis_position = {name : index for index, name in enumerate(self.basis_names)}
+        object_id_column = [str(object_id) for object_id in coefficient_table["objectid"].to_pylist()]
+        residual_object_ids = [str(object_id) for object_id in residual_table["objectid"].to_pylist()]
+        residual_series = residual_table[self.SERIES_ID].to_pylist()
+        # et bygg kan ha bare restledd (alle koeffisienter null) og en serie bare restledd
+        self.object_ids = list(dict.fromkeys(object_id_column + residual_object_ids))
+        self.column_index = {object_id : index for index, object_id in enumerate(self.object_ids)}
+        self.series_ids = list(dict.fromkeys(coefficient_table[self.SERIES_ID].to_pylist() + residual_series))
+        series_column = coefficient_table[self.SERIES_ID].to_pylist()
+        basis_column = coefficient_table["basis"].to_pylist()
+        scale_column = coefficient_table["skala"].to_numpy()
+        rows = np.array([self.column_index[object_id] for object_id in object_id_column], dtype = int)
+        columns = np.array([basis_position[name] for name in basis_column], dtype = int)
+        self.coefficients = {}
+        for series_id in self.series_ids:
+            mask = np.array([value == series_id for value in series_column], dtype = bool)
+            self.coefficients[series_id] = sparse.csr_matrix((scale_column[mask], (rows[mask], columns[mask])), shape = (len(self.object_ids), len(self.basis_names)))
+        # restledd per serie: (bygg med restledd i serien x 8760) og posisjonen til hvert bygg i blokken
+        hours = [column for column in residual_table.column_names if column not in self.METADATA_COLUMNS]
+        residuals = np.array([residual_table[hour].to_numpy() for hour in hours], dtype = float).T.reshape(residual_table.num_rows, 8760)
+        self.residual_index, self.residual_block = {}, {}
+        for series_id in self.series_ids:
+            pairs = [row for row, value in enumerate(residual_series) if value == series_id]
+            self.residual_index[series_id] = {residual_object_ids[row] : index for index, row in enumerate(pairs)}
+            self.residual_block[series_id] = residuals[pairs]
+            self.residual_block[series_id].setflags(write = False)
+        self.basis.setflags(write = False)
+
+    def columns(self, object_ids):
+        return [self.column_index[object_id] for object_id in object_ids if object_id in self.column_index]
+
+    def aggregate(self, object_ids):
+        columns = self.columns(object_ids)
+        results = {}
+        for series_id in self.series_ids:
+            weights = np.asarray(self.coefficients[series_id][columns].sum(axis = 0)).ravel()
+            residual_index = self.residual_index[series_id]
+            residual_rows = [residual_index[object_id] for object_id in object_ids if object_id in residual_index]
+            results[series_id] = weights @ self.basis + self.residual_block[series_id][residual_rows].sum(axis = 0)
+        return results
+
+    def series_block(self, series_id):
+        # (bygg x timer) for én serie, rekonstruert fra basis og restledd
+        block = np.asarray(self.coefficients[series_id] @ self.basis)
+        block[[self.column_index[object_id] for object_id in self.residual_index[series_id]]] += self.residual_block[series_id]
+        return block
+
+    def aggregate_groups(self, groups):
+        membership = selection_membership(groups, self.column_index)
+        results = {}
+        for series_id in self.series_ids:
+            weights = np.asarray((membership @ self.coefficients[series_id]).todense())
+            residual_membership = selection_membership(groups, self.residual_index[series_id])
+            results[series_id] = weights @ self.basis + residual_membership @ self.residual_block[series_id]
+        return results
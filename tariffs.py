@@ -0,0 +1,51 @@
+import json
+import os
+import numpy as np
+
+TARIFF_FILE = "input/nettariffer.json"
+DAYS_IN_MONTHS = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+MONTH_OF_DAY = np.repeat(np.arange(12), DAYS_IN_MONTHS)
+
+# Eksempelsatser, overstyres av input/nettariffer.json (samme format)
+DEFAULT_TARIFFS = {
+    "Snitt av 3 høyeste døgnmaks per måned" : {
+        "metode" : "topp_k_dogn",
+        "k" : 3,
+        "kr_per_kW_maaned" : [60] * 12,
+    },
+    "Månedsmaks (vinter/sommer)" : {
+        "metode" : "maks",
+        "kr_per_kW_maaned" : [120, 120, 120, 40, 40, 40, 40, 40, 40, 40, 120, 120],
+    },
+}
+
+def read_tariffs(filename = TARIFF_FILE):
+    if not os.path.exists(filename):
+        return DEFAULT_TARIFFS
+    with open(filename, encoding = "utf-8") as f:
+        return json.load(f)
+
+def _monthly_days(array):
+    # (..., 8760) -> (..., 12, 31) med døgnmaks, tomme dager fylles med -inf
+    array = np.nan_to_num(np.asarray(array, dtype = float))
+    daily_max = array.reshape(array.shape[:-1] + (365, 24)).max(axis = -1)
+    monthly = np.full(array.shape[:-1] + (12, 31), -np.inf)
+    day_in_month = np.arange(365) - np.repeat(np.cumsum([0] + DAYS_IN_MONTHS[:-1]), DAYS_IN_MONTHS)
+    monthly[..., MONTH_OF_DAY, day_in_month] = daily_max
+    return monthly
+
+def monthly_billing_demand(array, tariff):
+    monthly = _monthly_days(array)
+    if tariff["metode"] == "maks":
+        demand = monthly.max(axis = -1)
+    elif tariff["metode"] == "topp_k_dogn":
+        k = tariff["k"]
+        demand = -np.sort(-monthly, axis = -1)[..., :k].mean(axis = -1)
+    else:
+        raise ValueError(f"Ukjent tariffmetode: {tariff['metode']}")
+    return np.maximum(demand, 0)
+
+def capacity_cost(array, tariff):
+    demand = monthly_billing_demand(array, tariff)
+    monthly_cost = demand * np.asarray(tariff["kr_per_kW_maaned"], dtype = float)
+    return monthly_cost.sum(axis = -1), demand
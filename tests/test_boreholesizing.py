@@ -0,0 +1,13 @@
+import numpy as np
+from boreholesizing import size_boreholes, MAX_BOREHOLES, MAX_DEPTH, COST_PER_METER
+
+def test_meters_grow_with_load_and_well_count_is_capped():
+    profile = np.clip(np.cos(np.linspace(0, 2 * np.pi, 8760)), 0, None) + 0.2
+    extraction = np.outer([0, 2, 10, 40, 400], profile)
+    meters, boreholes, cost = size_boreholes(extraction)
+    assert meters[0] == 0 and boreholes[0] == 0
+    assert np.all(np.diff(meters) > 0)
+    assert np.all(boreholes <= MAX_BOREHOLES)
+    assert boreholes[-1] == MAX_BOREHOLES
+    assert np.all(meters[1:-1] <= boreholes[1:-1] * MAX_DEPTH)
+    assert np.allclose(cost, meters * COST_PER_METER)
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+import pyarrow.csv as pa_csv
+from superposition import basis_matrix, compress, CompressedHourlyData
+
+def test_compressed_csv_round_trip_equals_direct_sum(tmp_path):
+    rng = np.random.default_rng(0)
+    basis_names, basis = basis_matrix({"kontor" : rng.random(8760), "bolig" : rng.random(8760)})
+    object_ids = np.array([11, 12, 13, 14])
+    # 11 og 12 er eksakte skalerte basisprofiler, 13 er ikke eksakt i én serie og 14 i begge
+    thermal = np.array([2 * basis[0], basis[0] + 3 * basis[1], 0.5 * basis[1], basis[0] + rng.random(8760)])
+    electric = np.array([basis[1], 4 * basis[0], basis[1] + rng.random(8760), rng.random(8760)])
+    matrices = {"_termisk_energibehov" : thermal, "_nettutveksling_energi_liste" : electric}
+    df_coefficients, df_residuals = compress(matrices, object_ids, [basis_names] * len(object_ids), basis_names, basis)
+    assert sorted(zip(df_residuals["ID"], df_residuals["objectid"])) == [("_nettutveksling_energi_liste", 13), ("_nettutveksling_energi_liste", 14), ("_termisk_energibehov", 14)]
+    df_coefficients.to_csv(tmp_path / "komprimert.csv")
+    df_residuals.to_csv(tmp_path / "residualer.csv")
+    pd.DataFrame(basis.T, columns = basis_names).to_csv(tmp_path / "basisprofiler.csv")
+    hourly = CompressedHourlyData(*[pa_csv.read_csv(tmp_path / filename) for filename in ["komprimert.csv", "residualer.csv", "basisprofiler.csv"]])
+    selection = ["11", "13", "14"]
+    groups = [["11", "12"], ["13", "14"], ["12", "14", "99"]]
+    aggregated = hourly.aggregate(selection)
+    aggregated_groups = hourly.aggregate_groups(groups)
+    position = {str(object_id) : index for index, object_id in enumerate(object_ids)}
+    for series_name, matrix in matrices.items():
+        assert np.allclose(aggregated[series_name], matrix[[position[object_id] for object_id in selection]].sum(axis = 0))
+        for i, group in enumerate(groups):
+            assert np.allclose(aggregated_groups[series_name][i], matrix[[position[object_id] for object_id in group if object_id in position]].sum(axis = 0))
+        assert np.allclose(hourly.series_block(series_name)[[hourly.column_index[str(object_id)] for object_id in object_ids]], matrix)
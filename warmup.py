@@ -0,0 +1,81 @@
+import threading
+import time
+import pandas as pd
+from projects import read_projects, available_projects
+from scenariocatalog import ScenarioCatalog, file_version, read_only
+
+# Forvarming: alle simulerte prosjekter og scenarier i prosjektmanifestet lastes og indekseres i en bakgrunnstråd
+# når serveren starter (se serve.py), slik at første bruker etter en omstart ikke betaler for lastingen.
+# Sesjoner som ber om noe som lastes akkurat nå, venter på den samme lastingen (se ResidentCache.get).
+WARMUP_TIMEOUT = 120 # sekunder serve.py venter på forvarmingen før serveren starter uansett
+
+def load_temperature_array(filename, version):
+    return read_only(pd.read_excel(filename).to_numpy().ravel())
+
+def load_building_gdf(catalog, building_area):
+    import geopandas as gpd
+    from shapely.geometry import Point
+    df = catalog.summary(ScenarioCatalog.REFERENCE_SCENARIO, column = 'bygningsomraadeid', values = [building_area])
+    geometry = [Point(lon, lat) for lon, lat in zip(df['x'], df['y'])]
+    gdf = gpd.GeoDataFrame(df, geometry=geometry, crs = "25832")
+    return gdf
+
+def temperature_array(catalog, filename):
+    version = file_version(filename)
+    return catalog.cached(("utetemperatur", filename, version), lambda: load_temperature_array(filename, version))
+
+def building_gdf(catalog, building_area, dataset_key = None):
+    dataset_key = catalog.dataset_key() if dataset_key is None else dataset_key
+    return catalog.cached(("kart", dataset_key, building_area), lambda: load_building_gdf(catalog, building_area))
+
+def warm_project(project_name, project, status):
+    catalog = ScenarioCatalog(folder_path = project["output"], project = project_name)
+    steps = [lambda: temperature_array(catalog, project["utetemperatur"])]
+    for scenario_name in catalog.scenario_names:
+        steps += [
+            lambda scenario_name = scenario_name: catalog.summary_table(scenario_name),
+            lambda scenario_name = scenario_name: catalog.peaks(scenario_name),
+            lambda scenario_name = scenario_name: catalog.cube(scenario_name),
+        ]
+        if catalog.has_hourly(scenario_name):
+            steps.append(lambda scenario_name = scenario_name: catalog.hourly(scenario_name))
+    dataset_key = catalog.dataset_key()
+    steps += [lambda building_area = building_area: building_gdf(catalog, building_area, dataset_key) for building_area in catalog.building_areas()]
+    for step in steps:
+        # fullt lager: videre forvarming ville bare kaste ut det som nettopp ble lastet
+        if catalog.cache.resident_bytes() >= catalog.cache.budget:
+            status["avbrutt"] = "minnebudsjett"
+            return
+        try:
+            step()
+        except Exception as error:
+            status["feil"].append(f"{project_name}: {error}")
+        status["lastet"] += 1
+
+def warm_projects(status):
+    start_time = time.time()
+    try:
+        projects = read_projects()
+        for project_name in available_projects(projects):
+            try:
+                warm_project(project_name, projects[project_name], status)
+            except Exception as error:
+                status["feil"].append(f"{project_name}: {error}")
+    finally:
+        status["tid"] = time.time() - start_time
+        status["ferdig"].set()
+
+WARMUP_LOCK = threading.Lock()
+WARMUP_STATUS = {}
+
+def start_warmup():
+    # idempotent: første kall starter tråden, senere kall (fra serve.py eller app.py) gir samme status
+    with WARMUP_LOCK:
+        if "tråd" not in WARMUP_STATUS:
+            WARMUP_STATUS.update({"lastet" : 0, "feil" : [], "ferdig" : threading.Event()})
+            WARMUP_STATUS["tråd"] = threading.Thread(target = warm_projects, args = (WARMUP_STATUS,), name = "forvarming", daemon = True)
+            WARMUP_STATUS["tråd"].start()
+    return WARMUP_STATUS
+
+def wait_for_warmup(timeout = WARMUP_TIMEOUT):
+    return start_warmup()["ferdig"].wait(timeout)
@@ -0,0 +1,59 @@
+import hashlib
+import os
+import numpy as np
+import pandas as pd
+from batchsimulation import coverage_cap, ashp_tables, ashp_supply
+from peakanalysis import SEASON_MASKS
+
+# Flere temperaturår (ett regneark per år i WEATHER_FOLDER) evalueres med året som første dimensjon,
+# slik at nettet kan dimensjoneres etter kaldeste år uten å kjøre hele simuleringen på nytt.
+WEATHER_FOLDER = "input/vaerdata"
+PROFILE_CACHE = "src/profet_data_{key}.csv"
+PROFILE_KINDS = ["DHW", "SPACEHEATING", "ELECTRIC"]
+
+def weather_files(folder = WEATHER_FOLDER):
+    if not os.path.isdir(folder):
+        return []
+    return [f"{folder}/{filename}" for filename in sorted(os.listdir(folder)) if filename.endswith(".xlsx")]
+
+def read_weather_years(filenames):
+    years = {}
+    for filename in filenames:
+        array = pd.read_excel(filename).to_numpy(dtype = float).flatten()
+        if len(array) != 8760:
+            raise ValueError(f"{filename} har {len(array)} timer, forventet 8760")
+        years[os.path.splitext(os.path.basename(filename))[0]] = array
+    return years
+
+def profile_cache_file(temperature):
+    key = hashlib.sha1(np.asarray(temperature, dtype = float).tobytes()).hexdigest()[:12]
+    return PROFILE_CACHE.format(key = key)
+
+def profile_stack(year_profiles, profile_keys):
+    # {år: {kolonne: 8760}} -> {type: (år x profiler x 8760)}
+    return {kind : np.array([[np.asarray(profiles[f"{key}_{kind}"], dtype = float) for key in profile_keys] for profiles in year_profiles.values()]) for kind in PROFILE_KINDS}
+
+def heat_pump_balance(thermal, temperatures, gshp, ashp, gshp_coverage, gshp_cop, ashp_cop_nominal = 5, ashp_power_coverage = 40, ashp_max = 10):
+    # thermal: (år x bygg x 8760) -> bidrag til nettutveksling fra varmepumpene: kompressor - levert fra varmepumpe
+    balance = np.zeros_like(thermal)
+    n_years = thermal.shape[0]
+    if np.any(gshp):
+        thermal_gshp = thermal[:, gshp].reshape(-1, 8760)
+        supply = coverage_cap(thermal_gshp, np.tile(gshp_coverage[gshp], n_years)).reshape(n_years, -1, 8760)
+        balance[:, gshp] = supply / gshp_cop[gshp][None, :, None] - supply
+    if np.any(ashp):
+        thermal_ashp = thermal[:, ashp]
+        p_nominal = np.minimum(np.max(thermal_ashp, axis = 2) * ashp_power_coverage / 100, ashp_max)
+        temperature = np.asarray(temperatures, dtype = float)[:, None, :]
+        supply, cop = ashp_supply(thermal_ashp, temperature, p_nominal, ashp_tables(temperature))
+        balance[:, ashp] = supply / (cop * ashp_cop_nominal) - supply
+    return balance
+
+def ensemble_report(year_names, totals):
+    # totals: (år x 8760) samlet nettutveksling -> én rad per år, året med høyeste topp markert
+    df = pd.DataFrame({"vaeraar" : year_names, "energi" : totals.sum(axis = 1), "effekt" : np.max(totals, axis = 1)})
+    for season, mask in SEASON_MASKS.items():
+        if season != "aar":
+            df[f"{season}effekt"] = np.max(totals[:, mask], axis = 1)
+    df["dimensjonerende"] = np.arange(len(df)) == np.argmax(df["effekt"].to_numpy())
+    return df